@@ -16,6 +16,7 @@ from app.managers.session_manager import session_manager
 from app.managers.logger_manager import logger_manager
 from app.managers.mysql_manager import mysql_manager
 from app.managers.redis_manager import redis_manager
+from app.managers.write_queue_manager import write_queue_manager
 from app.managers.prometheus_manager import prometheus_metrics
 from app.core.security import verify_token, is_token_blacklisted
 import asyncio
@@ -238,20 +239,17 @@ async def handle_stream_response(
                 'content_length': len(total_content)
             })
         
-        # 如果还没有启动后台保存任务，则在这里执行
+        # 如果还没有启动后台保存任务，则交给后台写入队列，不阻塞当前连接的后续消息
         if not save_started:
-            try:
-                await _background_save_ai_response(
-                    user_id=user_id,
-                    session_id=session_id,
-                    user_input=user_input,
-                    total_content=total_content,
-                    response_metadata=response_metadata,
-                    logger_manager=logger_manager,
-                    prometheus_metrics=prometheus_metrics
-                )
-            except Exception as save_error:
-                logging.error(f"最终保存操作失败: {save_error}")
+            write_queue_manager.submit('save_ai_response', lambda: _background_save_ai_response(
+                user_id=user_id,
+                session_id=session_id,
+                user_input=user_input,
+                total_content=total_content,
+                response_metadata=response_metadata,
+                logger_manager=logger_manager,
+                prometheus_metrics=prometheus_metrics
+            ))
         
         logging.debug(f"流式响应完成: 用户 {user_id}, stream_id: {stream_id}, 耗时: {stream_duration:.3f}s, 块数: {chunk_index}")
         
@@ -525,20 +523,20 @@ async def chat_endpoint(request: ChatRequest, user_id: str = Depends(verify_toke
         
         duration = time.time() - start_time
         
-        # 记录HTTP聊天响应
-        await logger_manager.log_chat_event(
+        # 记录HTTP聊天响应和性能日志：交给后台写入队列，不占用响应时间
+        write_queue_manager.submit('http_chat_response_log', lambda: logger_manager.log_chat_event(
             event_type="HTTP_CHAT_RESPONSE",
             session_id=session_id,
             user_id=user_id,
             message_content=ai_response[:100],
             duration=duration,
             trace_id=trace_id
-        )
-        
-        # 记录性能日志
-        await logger_manager.log_performance('http_chat', duration, 
-                                           {'user_id': user_id, 'message_length': len(user_message), 'response_length': len(ai_response)}, 
-                                           trace_id=trace_id)
+        ))
+        write_queue_manager.submit('http_chat_performance_log', lambda: logger_manager.log_performance(
+            'http_chat', duration,
+            {'user_id': user_id, 'message_length': len(user_message), 'response_length': len(ai_response)},
+            trace_id=trace_id
+        ))
         
         # 记录聊天响应指标
         prometheus_metrics.record_chat_event('http_chat_response', user_id=user_id)
@@ -953,6 +951,7 @@ async def websocket_endpoint(websocket: WebSocket):
                             
                             # 缓存AI回复到Redis
                             ai_redis_cache_start = time.time()
+                            redis_ai_success = False
                             try:
                                 redis_ai_success = await redis_manager.add_message_to_session(
                                     session_id=session_id,
@@ -1015,7 +1014,7 @@ async def websocket_endpoint(websocket: WebSocket):
                                         "context_length": len(context_messages),
                                         "timestamp": ai_timestamp.isoformat(),
                                         "ai_response_duration": ai_response_duration,
-                                        "redis_cached": redis_ai_success if 'redis_ai_success' in locals() else False
+                                        "redis_cached": redis_ai_success
                                     }
                                 )
                                 
@@ -1041,60 +1040,41 @@ async def websocket_endpoint(websocket: WebSocket):
                                 
                                 logging.error(f"保存AI回复失败: {e}")
                             
-                            # 检查是否启用流式输出
-                            stream_response = message_data.get("stream", True)
-                            
-                            if stream_response and enable_multi_agent:
-                                # 流式输出模式
-                                await handle_stream_response(
-                                    manager=manager,
-                                    session_id=session_id,
-                                    user_id=user_id,
-                                    user_input=user_message,
-                                    agent_coordinator=get_multi_agent_coordinator(),
-                                    response_metadata=response_metadata,
-                                    ai_timestamp=ai_timestamp,
-                                    logger_manager=logger_manager,
-                                    prometheus_metrics=prometheus_metrics
+                            # 一次性输出回复（多Agent模式已在上方以流式输出并continue）
+                            ai_send_start = time.time()
+                            try:
+                                await manager.send_personal_message(
+                                    json.dumps({
+                                        "type": "response", 
+                                        "content": ai_response, 
+                                        "sender": "assistant", 
+                                        "timestamp": ai_timestamp.isoformat(),
+                                        "metadata": response_metadata
+                                    }),
+                                    session_id
                                 )
-                            else:
-                                # 传统一次性输出模式
-                                ai_send_start = time.time()
-                                try:
-                                    await manager.send_personal_message(
-                                        json.dumps({
-                                            "type": "response", 
-                                            "content": ai_response, 
-                                            "sender": "assistant", 
-                                            "timestamp": ai_timestamp.isoformat(),
-                                            "metadata": response_metadata
-                                        }),
-                                        session_id
-                                    )
-                                    
-                                    ai_send_duration = time.time() - ai_send_start
-                                    
-                                    # 记录AI回复发送
-                                    await logger_manager.log_performance('send_ai_response', ai_send_duration, 
-                                                                       {'session_id': session_id, 'user_id': user_id, 'response_length': len(ai_response)})
-                                    
-                                    # 记录AI回复发送指标
-                                    prometheus_metrics.record_chat_event('ai_response_sent', session_id=session_id, user_id=user_id)
-                                    
-                                except Exception as e:
-                                    ai_send_duration = time.time() - ai_send_start
-                                    
-                                    await logger_manager.log_error('send_ai_response_error', str(e), 
-                                                                 {'session_id': session_id, 'user_id': user_id, 'duration': ai_send_duration})
-                                    
-                                    logging.error(f"发送AI回复失败: {e}")
+                                
+                                ai_send_duration = time.time() - ai_send_start
+                                
+                                # 记录AI回复发送
+                                await logger_manager.log_performance('send_ai_response', ai_send_duration, 
+                                                                   {'session_id': session_id, 'user_id': user_id, 'response_length': len(ai_response)})
+                                
+                                # 记录AI回复发送指标
+                                prometheus_metrics.record_chat_event('ai_response_sent', session_id=session_id, user_id=user_id)
+                                
+                            except Exception as e:
+                                ai_send_duration = time.time() - ai_send_start
+                                
+                                await logger_manager.log_error('send_ai_response_error', str(e), 
+                                                             {'session_id': session_id, 'user_id': user_id, 'duration': ai_send_duration})
+                                
+                                logging.error(f"发送AI回复失败: {e}")
                             
                             # 记录整个AI回复处理的总耗时
                             total_ai_duration = time.time() - ai_generation_start
-                            # 安全地获取context_messages长度，如果未定义则使用默认值
-                            context_length = len(context_messages) if 'context_messages' in locals() else 0
                             await logger_manager.log_performance('total_ai_response_processing', total_ai_duration, 
-                                                               {'session_id': session_id, 'user_id': user_id, 'response_length': len(ai_response), 'context_length': context_length})
+                                                               {'session_id': session_id, 'user_id': user_id, 'response_length': len(ai_response), 'context_length': len(context_messages)})
                             
                         except Exception as e:
                             ai_generation_duration = time.time() - ai_generation_start
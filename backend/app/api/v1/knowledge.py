@@ -296,7 +296,7 @@ async def delete_collection(collection_name: str):
         删除结果
     """
     try:
-        from app.services.knowledge_base import QdrantVectorStore
+        from app.services.knowledge_base import invalidate_retrieval_cache
         from qdrant_client import QdrantClient
         
         client = QdrantClient(host="localhost", port=6333)
@@ -310,6 +310,7 @@ async def delete_collection(collection_name: str):
             })
         
         client.delete_collection(collection_name)
+        invalidate_retrieval_cache(collection_name)
         
         if collection_name in knowledge_pipelines:
             del knowledge_pipelines[collection_name]
@@ -17,11 +17,13 @@ import uvicorn
 from app.api.v1 import auth, chat, metrics, knowledge, feedback
 from app.managers.redis_manager import redis_manager
 from app.managers.mysql_manager import mysql_manager
+from app.managers.write_queue_manager import write_queue_manager
 from app.managers.prometheus_manager import prometheus_metrics
+from app.services.tools.logger_tool import setup_queue_logging
 from app.middleware.prometheus_middleware import PrometheusMiddleware
 from app.core.config import settings
 
-logging.basicConfig(level=logging.INFO)
+setup_queue_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -48,12 +50,28 @@ app.include_router(knowledge.router, prefix="/api/v1/knowledge", tags=["知识
 
 @app.on_event("startup")
 async def startup():
+    # 持久化与日志写入由后台队列消费，不占用请求关键路径
+    write_queue_manager.start()
+    
     try:
         await redis_manager.connect()
         await mysql_manager.connect()
         logger.info("数据库连接初始化成功")
     except Exception as e:
         logger.error(f"数据库连接初始化失败: {e}")
+    
+    # 启动时预热RAG检索链路和Agent协调器，首个请求不再承担冷启动开销
+    if chat.rag_pipeline is not None:
+        await chat.rag_pipeline.warm_up()
+        try:
+            chat.get_multi_agent_coordinator()
+        except Exception as e:
+            logger.error(f"Agent协调器预热失败: {e}")
+
+@app.on_event("shutdown")
+async def shutdown():
+    # 等待后台队列中尚未完成的写入
+    await write_queue_manager.stop()
 
 @app.get("/")
 async def root():
@@ -68,10 +86,13 @@ async def health_check():
     return {"status": "healthy"}
 
 if __name__ == "__main__":
+    # 生产环境关闭热重载并按CPU核数启动多个worker
+    is_production = os.getenv('NODE_ENV') == 'production'
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=not is_production,
+        workers=os.cpu_count() if is_production else None,
         log_level="info"
     )
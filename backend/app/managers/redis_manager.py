@@ -18,6 +18,7 @@ class RedisManager:
         self.redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
         self.redis: Optional[aioredis.Redis] = None
         self.redis_sync: Optional[redis.Redis] = None  # 同步Redis连接
+        self.redis_binary: Optional[redis.Redis] = None  # 同步二进制连接（不解码响应）
         self.session_prefix = "session:"
         self.cache_prefix = "cache:"
         self.conversation_limit = 3  # 保留最近3条消息
@@ -55,6 +56,9 @@ class RedisManager:
         if self.redis_sync:
             self.redis_sync.close()
             self.redis_sync = None
+        if self.redis_binary:
+            self.redis_binary.close()
+            self.redis_binary = None
         logger.info("Redis连接已断开")
     
     async def _ensure_connection(self):
@@ -262,6 +266,32 @@ class RedisManager:
             logger.error(f"获取键值失败: {e}")
             return None
 
+    async def mget_async(self, keys: List[str]) -> List[Optional[str]]:
+        """批量获取键值，一次往返（异步方法）"""
+        if not keys or not await self._ensure_connection():
+            return [None] * len(keys)
+        
+        try:
+            return await self.redis.mget(keys)
+        except Exception as e:
+            logger.error(f"批量获取键值失败: {e}")
+            return [None] * len(keys)
+
+    async def setex_many_async(self, mapping: Dict[str, Any], seconds: int) -> bool:
+        """批量设置键值对及过期时间，通过事务管道一次提交（异步方法）"""
+        if not mapping or not await self._ensure_connection():
+            return False
+        
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for key, value in mapping.items():
+                    pipe.setex(key, seconds, value)
+                results = await pipe.execute()
+            return all(results)
+        except Exception as e:
+            logger.error(f"批量设置键值对失败: {e}")
+            return False
+
     # 同步接口供security.py使用
     def setex(self, key: str, seconds: int, value: str) -> bool:
         """设置键值对并设置过期时间（同步接口）"""
@@ -289,6 +319,53 @@ class RedisManager:
             logger.error(f"删除键值失败: {e}")
             return False
 
+    def mget(self, keys: List[str]) -> List[Optional[str]]:
+        """批量获取键值（同步接口）"""
+        try:
+            if hasattr(self, 'redis_sync') and self.redis_sync:
+                return self.redis_sync.mget(keys)
+            else:
+                logger.warning("同步Redis连接不可用")
+                return [None] * len(keys)
+        except Exception as e:
+            logger.error(f"批量获取键值失败: {e}")
+            return [None] * len(keys)
+
+    def incr(self, key: str) -> Optional[int]:
+        """键值自增（同步接口）；供独立脚本使用，未连接时按需建立同步连接"""
+        try:
+            if not self.redis_sync:
+                self.redis_sync = redis.from_url(self.redis_url, decode_responses=True)
+            return self.redis_sync.incr(key)
+        except Exception as e:
+            logger.error(f"键值自增失败: {e}")
+            return None
+
+    def _binary_client(self) -> redis.Redis:
+        """按需建立不解码响应的同步连接，用于存取原始字节（如向量）"""
+        if not self.redis_binary:
+            self.redis_binary = redis.from_url(self.redis_url, decode_responses=False)
+        return self.redis_binary
+
+    def mget_bytes(self, keys: List[str]) -> List[Optional[bytes]]:
+        """批量获取原始字节值（同步接口）"""
+        try:
+            return self._binary_client().mget(keys)
+        except Exception as e:
+            logger.error(f"批量获取字节值失败: {e}")
+            return [None] * len(keys)
+
+    def set_many_bytes(self, mapping: Dict[str, bytes], px: int) -> bool:
+        """批量写入原始字节值，过期时间单位为毫秒（同步接口）"""
+        try:
+            pipe = self._binary_client().pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.set(key, value, px=px)
+            return all(pipe.execute())
+        except Exception as e:
+            logger.error(f"批量写入字节值失败: {e}")
+            return False
+
     def get(self, key: str) -> Optional[str]:
         """获取键值（同步接口）"""
         try:
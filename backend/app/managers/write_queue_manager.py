@@ -0,0 +1,95 @@
+"""
+后台写入队列管理器
+将Redis/MySQL持久化和日志记录从请求关键路径移到后台任务，失败时按指数退避重试
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 队列容量上限，超出后丢弃新的写入并记录日志
+_QUEUE_MAXSIZE = 10000
+# 并发消费的后台任务数，避免单个慢写入阻塞整个队列
+_WORKER_COUNT = 4
+# 单个写入任务的最大重试次数与初始退避时间（秒）
+_MAX_RETRIES = 3
+_RETRY_BASE_DELAY = 0.1
+
+
+class WriteQueueManager:
+    def __init__(self, maxsize: int = _QUEUE_MAXSIZE, worker_count: int = _WORKER_COUNT):
+        self.maxsize = maxsize
+        self.worker_count = worker_count
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        """后台消费任务是否在运行"""
+        return any(not worker.done() for worker in self._workers)
+
+    def start(self):
+        """启动后台消费任务（需在事件循环中调用，如应用startup事件）"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [asyncio.create_task(self._run()) for _ in range(self.worker_count)]
+        logger.info(f"后台写入队列已启动，消费任务数: {self.worker_count}")
+
+    async def stop(self):
+        """等待队列中剩余的写入完成后停止后台任务"""
+        if not self.running:
+            return
+        await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("后台写入队列已停止")
+
+    def submit(self, name: str, factory: Callable[[], Awaitable]) -> bool:
+        """
+        提交一个写入任务，立即返回
+
+        Args:
+            name: 任务名称，用于日志
+            factory: 无参函数，每次调用返回一个新的协程（重试时重新调用）
+
+        Returns:
+            是否成功入队；队列已满时丢弃并返回False
+        """
+        if not self.running:
+            self.start()
+        try:
+            self._queue.put_nowait((name, factory))
+            return True
+        except asyncio.QueueFull:
+            logger.error(f"后台写入队列已满，丢弃任务: {name}")
+            return False
+
+    async def _run(self):
+        """后台任务：依次执行队列中的写入"""
+        while True:
+            name, factory = await self._queue.get()
+            try:
+                await self._execute(name, factory)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, name: str, factory: Callable[[], Awaitable]):
+        """执行单个写入，失败时按指数退避重试"""
+        for attempt in range(_MAX_RETRIES + 1):
+            try:
+                await factory()
+                return
+            except Exception as e:
+                if attempt == _MAX_RETRIES:
+                    logger.error(f"后台写入任务 {name} 在{_MAX_RETRIES}次重试后仍然失败: {e}")
+                    return
+                logger.warning(f"后台写入任务 {name} 第{attempt + 1}次尝试失败: {e}")
+                await asyncio.sleep(_RETRY_BASE_DELAY * (2 ** attempt))
+
+
+# 全局写入队列管理器实例
+write_queue_manager = WriteQueueManager()
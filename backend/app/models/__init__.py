@@ -8,7 +8,7 @@ from .api import (
     SessionListResponse, SessionRenameRequest, SearchRequest,
     SearchResponse, UploadResponse, CollectionInfoResponse
 )
-from .shared import IntentType, AgentResponse
+from .shared import IntentType, INTENT_WIRE, AgentResponse
 
 __all__ = [
     "Base",
@@ -18,5 +18,5 @@ __all__ = [
     "ChatRequest", "SessionCreateRequest", "SessionResponse",
     "SessionListResponse", "SessionRenameRequest", "SearchRequest",
     "SearchResponse", "UploadResponse", "CollectionInfoResponse",
-    "IntentType", "AgentResponse"
+    "IntentType", "INTENT_WIRE", "AgentResponse"
 ]
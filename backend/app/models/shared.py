@@ -1,25 +1,54 @@
-from enum import Enum
+from enum import IntEnum
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 
-class IntentType(Enum):
-    """用户意图类型"""
-    PRESALES = "presales"
-    ORDER = "order"
-    LOGISTICS = "logistics"
-    AFTER_SALES = "after_sales"
-    RECOMMENDATION = "recommendation"
-    COMPLAINT = "complaint"
-    GREETING = "greeting"
-    GENERAL = "general"
-    UNKNOWN = "unknown"
+class IntentType(IntEnum):
+    """用户意图类型（整数值便于路由分派，对外使用 wire 字符串）"""
+    UNKNOWN = 0
+    PRESALES = 1
+    ORDER = 2
+    LOGISTICS = 3
+    AFTER_SALES = 4
+    RECOMMENDATION = 5
+    COMPLAINT = 6
+    GREETING = 7
+    GENERAL = 8
+    
+    @property
+    def wire(self) -> str:
+        """对外（日志/JSON/LLM输出）使用的字符串名称"""
+        return INTENT_WIRE[self]
+    
+    @classmethod
+    def from_wire(cls, value: str) -> "IntentType":
+        """根据字符串名称解析意图类型"""
+        try:
+            return INTENT_FROM_WIRE[value]
+        except KeyError:
+            raise ValueError(f"{value!r} is not a valid IntentType") from None
+
+# 意图类型与对外字符串的映射，保持API和日志格式不变
+INTENT_WIRE: Dict[IntentType, str] = {
+    IntentType.PRESALES: "presales",
+    IntentType.ORDER: "order",
+    IntentType.LOGISTICS: "logistics",
+    IntentType.AFTER_SALES: "after_sales",
+    IntentType.RECOMMENDATION: "recommendation",
+    IntentType.COMPLAINT: "complaint",
+    IntentType.GREETING: "greeting",
+    IntentType.GENERAL: "general",
+    IntentType.UNKNOWN: "unknown",
+}
+INTENT_FROM_WIRE: Dict[str, IntentType] = {v: k for k, v in INTENT_WIRE.items()}
 
 class AgentResponse(BaseModel):
     """Agent响应数据结构"""
+    model_config = ConfigDict(frozen=True)
+    
     success: bool
     content: str
     intent: Optional[IntentType] = None
-    sources: List[Dict[str, Any]] = []
+    sources: List[Dict[str, Any]] = Field(default_factory=list)
     order_info: Optional[Dict[str, Any]] = None
     product_info: Optional[Dict[str, Any]] = None
-    context: Dict[str, Any] = {}
+    context: Dict[str, Any] = Field(default_factory=dict)
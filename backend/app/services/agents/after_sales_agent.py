@@ -19,6 +19,7 @@ from langchain_core.prompts import ChatPromptTemplate
 # 导入工具类
 from ..tools.logger_tool import LoggerTool
 from ..tools.redis_tool import RedisTool
+from ..tools.common_tool import CommonTool
 
 # 导入共享类型
 from app.models import IntentType, AgentResponse
@@ -63,7 +64,7 @@ class AfterSalesAgent:
         try:
             # 记录处理开始
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="AFTER_SALES_START",
                     message=f"开始处理售后问题: {user_input[:50]}...",
                     details={
@@ -83,7 +84,7 @@ class AfterSalesAgent:
             
             # 记录处理结果
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="AFTER_SALES_COMPLETE",
                     message="售后问题处理完成",
                     details={
@@ -113,7 +114,7 @@ class AfterSalesAgent:
             
             # 记录错误
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="AFTER_SALES_ERROR",
                     message=error_msg,
                     details={
@@ -142,7 +143,7 @@ class AfterSalesAgent:
         try:
             # 记录处理开始
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="AFTER_SALES_STREAM_START",
                     message=f"开始流式处理售后问题: {user_input[:50]}...",
                     details={
@@ -163,7 +164,7 @@ class AfterSalesAgent:
             
             # 记录处理结果
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="AFTER_SALES_STREAM_COMPLETE",
                     message="售后问题流式处理完成",
                     details={
@@ -180,7 +181,7 @@ class AfterSalesAgent:
             
             # 记录错误
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="AFTER_SALES_STREAM_ERROR",
                     message=error_msg,
                     details={
@@ -277,7 +278,7 @@ class AfterSalesAgent:
         """获取售后政策信息"""
         try:
             # 首先检查Redis缓存
-            cache_key = f"policy:{user_input}"
+            cache_key = f"policy:{CommonTool.cache_key(user_input)}"
             cached_policy = await self.redis_tool.get_cached_data(cache_key)
             if cached_policy:
                 logger.info(f"从缓存获取售后政策: {cache_key}")
@@ -7,9 +7,11 @@ import os
 import sys
 import json
 import time
+import hashlib
 import logging
 import random
 import asyncio
+from dataclasses import dataclass
 from typing import Dict, Any, Optional, AsyncGenerator
 
 from langchain_core.prompts import ChatPromptTemplate
@@ -32,11 +34,13 @@ try:
     from ...managers.mysql_manager import mysql_manager
     from ...managers.redis_manager import redis_manager
     from ...managers.logger_manager import logger_manager
+    from ...managers.write_queue_manager import write_queue_manager
 except ImportError as e:
     logging.warning(f"导入管理器模块失败: {e}")
     mysql_manager = None
     redis_manager = None
     logger_manager = None
+    write_queue_manager = None
 
 # 导入数据库和通用工具
 from ..tools.database_tool import DatabaseTool
@@ -45,6 +49,56 @@ from ..tools.common_tool import CommonTool
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 热门问题关键词（包含多Agent相关的热门问题）
+HOT_KEYWORDS = frozenset({
+    # 售后服务相关
+    "退货", "退换货", "退款", "售后", "退换", "换货", "退货政策", "退换政策",
+    "退货流程", "退换流程", "退货条件", "退换条件", "退货要求", "退换要求",
+    
+    # 订单相关
+    "订单", "订单查询", "订单状态", "订单详情", "订单号", "查看订单",
+    "订单进度", "发货", "配送", "快递", "物流", "收货", "签收",
+    
+    # 商品相关
+    "商品", "产品", "库存", "价格", "规格", "尺寸", "颜色", "材质",
+    "商品介绍", "产品详情", "规格参数", "使用方法", "注意事项",
+    
+    # 支付相关
+    "支付", "付款", "支付方式", "信用卡", "支付宝", "微信支付", "银联",
+    "分期付款", "花呗", "京东白条", "支付失败", "支付问题",
+    
+    # 会员服务相关
+    "会员", "积分", "优惠券", "折扣", "活动", "促销", "满减", "包邮",
+    "会员权益", "等级", "特权", "生日", "节日",
+    
+    # 客服相关
+    "客服", "联系", "电话", "地址", "营业时间", "投诉", "建议", "反馈",
+    "人工客服", "在线客服", "服务时间", "投诉处理",
+    
+    # 保修相关
+    "保修", "维修", "更换", "质保", "保证", "质量", "问题", "故障",
+    "售后服务", "技术支持", "维修网点", "维修费用",
+    
+    # 通用热门词汇
+    "政策", "流程", "条件", "要求", "规则", "条款", "说明", "介绍",
+    "帮助", "指南", "教程", "常见问题", "FAQ", "问题", "怎么办",
+    "如何", "怎么", "怎样", "为什么", "什么", "哪里", "谁"
+})
+
+
+def _match_hot_keywords(text: str) -> list:
+    """返回文本中出现的热门关键词"""
+    return [keyword for keyword in HOT_KEYWORDS if keyword in text]
+
+
+@dataclass
+class _SharedOutcome:
+    """与会话无关的处理结果，相同问题的并发请求共享同一份"""
+    response: AgentResponse
+    route_result: Optional[AgentResponse] = None  # 命中缓存时为None
+    agent_name: Optional[str] = None  # 需要计入统计的Agent
+
+
 class AgentCoordinator:
     """Agent协调器 - 管理多Agent协同"""
     
@@ -72,14 +126,22 @@ class AgentCoordinator:
             "after_sales_agent": {"calls": 0, "success_rate": 0.0, "avg_processing_time": 0.0},
             "product_agent": {"calls": 0, "success_rate": 0.0, "avg_processing_time": 0.0}
         }
+        
+        # 正在处理中的问题（问题摘要 -> 结果Future），相同问题并发到达时只处理一次
+        self._inflight: Dict[str, asyncio.Future] = {}
     
     async def process_message(self, user_input: str, session_id: str = None, trace_id: str = None) -> AgentResponse:
-        """处理用户消息的主入口"""
+        """
+        处理用户消息的主入口
+        
+        相同问题并发到达时只执行一次缓存检查、路由、检索和生成（single-flight），
+        每个请求再各自构建会话相关的context并记录交互日志和Agent统计
+        """
         start_time = time.time()
         
         try:
             # 记录消息处理开始
-            await self.logger_tool.log_system_event(
+            self.logger_tool.log_system_event(
                 event_type="MESSAGE_PROCESS_START",
                 message=f"开始处理用户消息: {user_input[:50]}...",
                 details={
@@ -89,112 +151,8 @@ class AgentCoordinator:
                 trace_id=trace_id
             )
             
-            # 0. 优先检查缓存命中（如果Redis管理器可用）
-            if redis_manager:
-                try:
-                    cached_response = await redis_manager.get_cached_response(user_input)
-                    if cached_response:
-                        logger.info(f"AgentCoordinator命中缓存，直接返回: {user_input[:30]}...")
-                        print(f"AgentCoordinator命中缓存，直接返回: {user_input[:30]}...")
-                        
-                        # 返回缓存的回复
-                        return AgentResponse(
-                            content=cached_response["response"],
-                            success=True,
-                            intent=IntentType.GENERAL,
-                            sources=[],
-                            context={
-                                "cache_hit": True,
-                                "cached_time": cached_response["timestamp"],
-                                "processing_time": time.time() - start_time
-                            }
-                        )
-                    else:
-                        logger.debug(f"AgentCoordinator缓存未命中，继续处理: {user_input[:30]}...")
-                        print(f"AgentCoordinator缓存未命中，继续处理: {user_input[:30]}...")
-                except Exception as cache_error:
-                    error_msg = str(cache_error) if cache_error else "未知异常"
-                    logger.warning(f"缓存检查失败，继续正常处理: {error_msg}")
-            
-            # 1. 意图路由
-            logger.info("开始意图路由...")
-            route_result = await self.intent_router.route(user_input)
-            self._update_agent_stats("intent_router", route_result.success, route_result.context.get("processing_time", 0))
-            
-            if not route_result.success:
-                return route_result
-            
-            intent = route_result.intent
-            extracted_info = route_result.context.get("extracted_info", {})
-            
-            # 2. 根据意图调用相应的Agent
-            agent_result = None
-            
-            if intent == IntentType.ORDER:
-                order_id = extracted_info.get("order_id")
-                logger.info(f"调用订单Agent，订单号: {order_id}")
-                agent_result = await self.order_agent.query_order(order_id, user_input, session_id)
-                self._update_agent_stats("order_agent", agent_result.success, agent_result.context.get("processing_time", 0))
-                
-            elif intent == IntentType.LOGISTICS:
-                tracking_number = extracted_info.get("tracking_number")
-                order_id = extracted_info.get("order_id")
-                logger.info(f"调用物流查询，订单号: {order_id}, 快递单号: {tracking_number}")
-                agent_result = await self.order_agent.query_logistics(tracking_number, order_id)
-                self._update_agent_stats("order_agent", agent_result.success, agent_result.context.get("processing_time", 0))
-                
-            elif intent == IntentType.AFTER_SALES:
-                order_id = extracted_info.get("order_id")
-                order_info = None
-                
-                if order_id:
-                    order_result = await self.order_agent.query_order(order_id, session_id=session_id)
-                    if order_result.success:
-                        order_info = order_result.order_info
-                
-                logger.info("调用售后Agent完整回答方法...")
-                agent_result = await self.after_sales_agent.handle_after_sales(user_input, order_info, session_id)
-                self._update_agent_stats("after_sales_agent", agent_result.success, agent_result.context.get("processing_time", 0))
-                
-            elif intent == IntentType.PRESALES:
-                logger.info("调用商品Agent完整回答方法...")
-                agent_result = await self.product_agent.query_product(user_input, session_id)
-                self._update_agent_stats("product_agent", agent_result.success, agent_result.context.get("processing_time", 0))
-                
-            elif intent == IntentType.GREETING:
-                logger.info("处理问候语完整回答...")
-                agent_result = await self._handle_greeting(user_input)
-                
-            elif intent == IntentType.UNKNOWN:
-                logger.info("未知意图，使用通用完整回答...")
-                agent_result = await self._handle_unknown_intent(user_input)
-                
-            else:
-                logger.info(f"其他意图类型完整回答: {intent.value}")
-                agent_result = await self._handle_general_intent(intent, user_input)
-            
-            # 3. 添加路由信息到结果中
-            if agent_result:
-                agent_result.context["intent_routing"] = route_result.context
-                agent_result.context["total_processing_time"] = time.time() - start_time
-                
-                # 记录用户交互
-                await self.logger_tool.log_user_interaction(
-                    user_id="unknown",  # 这里应该从会话中获取真实用户ID
-                    session_id=session_id or "default",
-                    user_input=user_input,
-                    agent_response=agent_result.content,
-                    metadata={
-                        "intent": intent.value,
-                        "success": agent_result.success,
-                        "processing_time": agent_result.context.get("total_processing_time", 0)
-                    }
-                )
-                
-                # 4. 多Agent场景下的热门问题缓存逻辑
-                await self._cache_hot_questions(user_input, agent_result.content, intent)
-            
-            return agent_result
+            outcome = await self._shared_outcome(user_input, session_id)
+            return self._finish_response(outcome, user_input, session_id, start_time)
             
         except Exception as e:
             total_time = time.time() - start_time
@@ -202,7 +160,7 @@ class AgentCoordinator:
             logger.error(error_msg)
             
             # 记录错误
-            await self.logger_tool.log_system_event(
+            self.logger_tool.log_system_event(
                 event_type="MESSAGE_PROCESS_ERROR",
                 message=error_msg,
                 details={
@@ -223,6 +181,170 @@ class AgentCoordinator:
                 }
             )
     
+    async def _shared_outcome(self, user_input: str, session_id: str = None) -> _SharedOutcome:
+        """获取与会话无关的处理结果；相同问题正在处理时等待其结果而不重复执行"""
+        key = hashlib.sha1(user_input.encode()).hexdigest()
+        
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            logger.info(f"相同问题正在处理中，等待其结果: {user_input[:30]}...")
+            await asyncio.wait([inflight])
+            # 首个请求被取消时自行处理；首个请求出错时抛出同一异常
+            if not inflight.cancelled():
+                return inflight.result()
+            return await self._resolve_message(user_input, session_id)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            outcome = await self._resolve_message(user_input, session_id)
+            future.set_result(outcome)
+            return outcome
+        except Exception as e:
+            future.set_exception(e)
+            # 标记异常已读取，没有等待者时不产生告警
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(key, None)
+    
+    async def _resolve_message(self, user_input: str, session_id: str = None) -> _SharedOutcome:
+        """缓存检查、意图路由、调用对应Agent；结果只取决于问题本身，可在并发请求间共享"""
+        start_time = time.time()
+        
+        # 0. 优先检查缓存命中（如果Redis管理器可用）
+        if redis_manager:
+            try:
+                cached_response = await redis_manager.get_cached_response(user_input)
+                if cached_response:
+                    logger.info(f"AgentCoordinator命中缓存，直接返回: {user_input[:30]}...")
+                    print(f"AgentCoordinator命中缓存，直接返回: {user_input[:30]}...")
+                    
+                    # 返回缓存的回复
+                    return _SharedOutcome(AgentResponse(
+                        content=cached_response["response"],
+                        success=True,
+                        intent=IntentType.GENERAL,
+                        sources=[],
+                        context={
+                            "cache_hit": True,
+                            "cached_time": cached_response["timestamp"],
+                            "processing_time": time.time() - start_time
+                        }
+                    ))
+                else:
+                    logger.debug(f"AgentCoordinator缓存未命中，继续处理: {user_input[:30]}...")
+                    print(f"AgentCoordinator缓存未命中，继续处理: {user_input[:30]}...")
+            except Exception as cache_error:
+                error_msg = str(cache_error) if cache_error else "未知异常"
+                logger.warning(f"缓存检查失败，继续正常处理: {error_msg}")
+        
+        # 1. 意图路由
+        logger.info("开始意图路由...")
+        route_result = await self.intent_router.route(user_input)
+        
+        if not route_result.success:
+            return _SharedOutcome(route_result, route_result)
+        
+        intent = route_result.intent
+        extracted_info = route_result.context.get("extracted_info", {})
+        
+        # 2. 根据意图调用相应的Agent
+        agent_name = None
+        
+        if intent == IntentType.ORDER:
+            order_id = extracted_info.get("order_id")
+            logger.info(f"调用订单Agent，订单号: {order_id}")
+            agent_result = await self.order_agent.query_order(order_id, user_input, session_id)
+            agent_name = "order_agent"
+            
+        elif intent == IntentType.LOGISTICS:
+            tracking_number = extracted_info.get("tracking_number")
+            order_id = extracted_info.get("order_id")
+            logger.info(f"调用物流查询，订单号: {order_id}, 快递单号: {tracking_number}")
+            agent_result = await self.order_agent.query_logistics(tracking_number, order_id)
+            agent_name = "order_agent"
+            
+        elif intent == IntentType.AFTER_SALES:
+            order_id = extracted_info.get("order_id")
+            order_info = None
+            
+            if order_id:
+                order_result = await self.order_agent.query_order(order_id, session_id=session_id)
+                if order_result.success:
+                    order_info = order_result.order_info
+            
+            logger.info("调用售后Agent完整回答方法...")
+            agent_result = await self.after_sales_agent.handle_after_sales(user_input, order_info, session_id)
+            agent_name = "after_sales_agent"
+            
+        elif intent == IntentType.PRESALES:
+            logger.info("调用商品Agent完整回答方法...")
+            agent_result = await self.product_agent.query_product(user_input, session_id)
+            agent_name = "product_agent"
+            
+        elif intent == IntentType.GREETING:
+            logger.info("处理问候语完整回答...")
+            agent_result = await self._handle_greeting(user_input)
+            
+        elif intent == IntentType.UNKNOWN:
+            logger.info("未知意图，使用通用完整回答...")
+            agent_result = await self._handle_unknown_intent(user_input)
+            
+        else:
+            logger.info(f"其他意图类型完整回答: {intent.wire}")
+            agent_result = await self._handle_general_intent(intent, user_input)
+        
+        # 3. 添加路由信息到结果中
+        agent_result.context["intent_routing"] = route_result.context
+        
+        # 4. 多Agent场景下的热门问题缓存逻辑（后台写入，不阻塞回复；并发的相同问题只写一次）
+        content = agent_result.content
+        if write_queue_manager:
+            write_queue_manager.submit(
+                'cache_hot_question',
+                lambda: self._cache_hot_questions(user_input, content, intent)
+            )
+        else:
+            await self._cache_hot_questions(user_input, content, intent)
+        
+        return _SharedOutcome(agent_result, route_result, agent_name)
+    
+    def _finish_response(self, outcome: _SharedOutcome, user_input: str,
+                         session_id: str, start_time: float) -> AgentResponse:
+        """为单个请求构建回复：context换成本会话的信息，并记录交互日志和Agent统计"""
+        response = outcome.response
+        route_result = outcome.route_result
+        context = dict(response.context)
+        if "session_id" in context:
+            context["session_id"] = session_id
+        
+        if route_result is not None:
+            self._update_agent_stats("intent_router", route_result.success, route_result.context.get("processing_time", 0))
+        if outcome.agent_name:
+            self._update_agent_stats(outcome.agent_name, response.success, response.context.get("processing_time", 0))
+        
+        if route_result is not None and route_result.success:
+            context["total_processing_time"] = time.time() - start_time
+            
+            # 记录用户交互
+            self.logger_tool.log_user_interaction(
+                user_id="unknown",  # 这里应该从会话中获取真实用户ID
+                session_id=session_id or "default",
+                user_input=user_input,
+                agent_response=response.content,
+                metadata={
+                    "intent": route_result.intent.wire,
+                    "success": response.success,
+                    "processing_time": context["total_processing_time"]
+                }
+            )
+        
+        # 共享结果可能同时返回给多个请求，每个请求拿到独立的副本
+        return response.model_copy(update={"context": context}, deep=True)
+    
     async def _handle_greeting(self, user_input: str) -> AgentResponse:
         """处理问候语"""
         greetings = [
@@ -303,7 +425,7 @@ class AgentCoordinator:
         """流式响应生成器 - 真正的端到端流式输出"""
         try:
             # 记录流式响应开始
-            await self.logger_tool.log_system_event(
+            self.logger_tool.log_system_event(
                 event_type="STREAM_RESPONSE_START",
                 message=f"用户 {session_id} 开始流式响应",
                 details={
@@ -382,18 +504,18 @@ class AgentCoordinator:
                     yield chunk
             
             # 记录流式响应完成
-            await self.logger_tool.log_system_event(
+            self.logger_tool.log_system_event(
                 event_type="STREAM_RESPONSE_COMPLETE",
                 message="流式响应完成",
                 details={
                     "session_id": session_id,
-                    "intent": intent.value if intent else "unknown"
+                    "intent": intent.wire if intent is not None else "unknown"
                 }
             )
             
         except Exception as e:
             logger.error(f"流式响应生成失败: {e}")
-            await self.logger_tool.log_system_event(
+            self.logger_tool.log_system_event(
                 event_type="STREAM_RESPONSE_ERROR",
                 message=f"流式响应失败: {e}",
                 details={
@@ -452,44 +574,8 @@ class AgentCoordinator:
     async def _cache_hot_questions(self, user_input: str, response: str, intent: IntentType):
         """多Agent场景下的热门问题缓存逻辑"""
         try:
-            # 扩展热门问题关键词列表（包含多Agent相关的热门问题）
-            hot_keywords = [
-                # 售后服务相关
-                "退货", "退换货", "退款", "售后", "退换", "换货", "退货政策", "退换政策",
-                "退货流程", "退换流程", "退货条件", "退换条件", "退货要求", "退换要求",
-                
-                # 订单相关
-                "订单", "订单查询", "订单状态", "订单详情", "订单号", "查看订单",
-                "订单进度", "发货", "配送", "快递", "物流", "收货", "签收",
-                
-                # 商品相关
-                "商品", "产品", "库存", "价格", "规格", "尺寸", "颜色", "材质",
-                "商品介绍", "产品详情", "规格参数", "使用方法", "注意事项",
-                
-                # 支付相关
-                "支付", "付款", "支付方式", "信用卡", "支付宝", "微信支付", "银联",
-                "分期付款", "花呗", "京东白条", "支付失败", "支付问题",
-                
-                # 会员服务相关
-                "会员", "积分", "优惠券", "折扣", "活动", "促销", "满减", "包邮",
-                "会员权益", "等级", "特权", "生日", "节日",
-                
-                # 客服相关
-                "客服", "联系", "电话", "地址", "营业时间", "投诉", "建议", "反馈",
-                "人工客服", "在线客服", "服务时间", "投诉处理",
-                
-                # 保修相关
-                "保修", "维修", "更换", "质保", "保证", "质量", "问题", "故障",
-                "售后服务", "技术支持", "维修网点", "维修费用",
-                
-                # 通用热门词汇
-                "政策", "流程", "条件", "要求", "规则", "条款", "说明", "介绍",
-                "帮助", "指南", "教程", "常见问题", "FAQ", "问题", "怎么办",
-                "如何", "怎么", "怎样", "为什么", "什么", "哪里", "谁"
-            ]
-            
-            # 检查是否包含热门关键词
-            matched_keywords = [kw for kw in hot_keywords if kw in user_input]
+            # 匹配热门关键词
+            matched_keywords = _match_hot_keywords(user_input)
             
             # 缓存条件判断（更宽松的策略）
             should_cache = False
@@ -503,7 +589,7 @@ class AgentCoordinator:
             # 条件2：意图类型为热门类型且回复内容较长
             elif intent in [IntentType.AFTER_SALES, IntentType.PRESALES, IntentType.ORDER] and len(response) > 20:
                 should_cache = True
-                cache_reason = f"热门意图类型: {intent.value}，回复内容较长({len(response)}字符)"
+                cache_reason = f"热门意图类型: {intent.wire}，回复内容较长({len(response)}字符)"
             
             # 条件3：回复内容很长（高质量通用标准）
             elif len(response) > 80:
@@ -121,7 +121,7 @@ class IntentRouterAgent:
                 "context": json.dumps(context, ensure_ascii=False)
             })
             
-            intent = IntentType(result.get("intent", "unknown"))
+            intent = IntentType.from_wire(result.get("intent", "unknown"))
             confidence = result.get("confidence", 0.0)
             extracted_info = result.get("extracted_info", {})
             reasoning = result.get("reasoning", "")
@@ -130,12 +130,12 @@ class IntentRouterAgent:
             
             # 记录路由结果
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="INTENT_ROUTED",
-                    message=f"意图路由完成: {intent.value}",
+                    message=f"意图路由完成: {intent.wire}",
                     details={
                         "user_input": user_input,
-                        "intent": intent.value,
+                        "intent": intent.wire,
                         "confidence": confidence,
                         "extracted_info": extracted_info,
                         "reasoning": reasoning,
@@ -145,7 +145,7 @@ class IntentRouterAgent:
             
             return AgentResponse(
                 success=True,
-                content=f"已识别用户意图：{intent.value}",
+                content=f"已识别用户意图：{intent.wire}",
                 intent=intent,
                 context={
                     "confidence": confidence,
@@ -160,7 +160,7 @@ class IntentRouterAgent:
             logger.error(f"意图路由失败: {e}")
             
             if self.logger_tool:
-                await self.logger_tool.log_error('intent_routing_error', str(e), {
+                self.logger_tool.log_error('intent_routing_error', str(e), {
                     'user_input': user_input,
                     'context': context,
                     'processing_time': processing_time
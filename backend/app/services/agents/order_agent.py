@@ -79,7 +79,7 @@ class OrderAgent:
         try:
             # 记录查询开始
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="ORDER_QUERY_START",
                     message=f"开始查询订单: {order_id or '未提供订单号'}",
                     details={
@@ -120,7 +120,7 @@ class OrderAgent:
             
             # 记录查询结果
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="ORDER_QUERY_RESULT",
                     message=f"订单查询完成: {'成功' if order_info else '失败'}",
                     details={
@@ -165,7 +165,7 @@ class OrderAgent:
             
             # 记录错误
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="ORDER_QUERY_ERROR",
                     message=error_msg,
                     details={
@@ -192,7 +192,7 @@ class OrderAgent:
         try:
             # 记录查询开始
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="ORDER_STREAM_START",
                     message=f"开始流式查询订单: {order_id or '未提供订单号'}",
                     details={
@@ -245,7 +245,7 @@ class OrderAgent:
                 
                 # 记录查询结果
                 if self.logger_tool:
-                    await self.logger_tool.log_system_event(
+                    self.logger_tool.log_system_event(
                         event_type="ORDER_STREAM_COMPLETE",
                         message=f"订单流式查询完成: 成功",
                         details={
@@ -259,7 +259,7 @@ class OrderAgent:
                 
                 # 记录查询结果
                 if self.logger_tool:
-                    await self.logger_tool.log_system_event(
+                    self.logger_tool.log_system_event(
                         event_type="ORDER_STREAM_COMPLETE",
                         message=f"订单流式查询完成: 失败",
                         details={
@@ -276,7 +276,7 @@ class OrderAgent:
             
             # 记录错误
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="ORDER_STREAM_ERROR",
                     message=error_msg,
                     details={
@@ -19,6 +19,7 @@ from langchain_core.prompts import ChatPromptTemplate
 # 导入工具类
 from ..tools.logger_tool import LoggerTool
 from ..tools.redis_tool import RedisTool
+from ..tools.common_tool import CommonTool
 
 # 导入共享类型
 from app.models import IntentType, AgentResponse
@@ -62,7 +63,7 @@ class ProductAgent:
         try:
             # 记录查询开始
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="PRODUCT_QUERY_START",
                     message=f"开始查询商品信息: {user_input[:50]}...",
                     details={
@@ -81,7 +82,7 @@ class ProductAgent:
             
             # 记录查询结果
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="PRODUCT_QUERY_COMPLETE",
                     message="商品信息查询完成",
                     details={
@@ -108,7 +109,7 @@ class ProductAgent:
             
             # 记录查询失败
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="PRODUCT_QUERY_ERROR",
                     message=error_msg,
                     details={
@@ -134,7 +135,7 @@ class ProductAgent:
         try:
             # 记录查询开始
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="PRODUCT_STREAM_START",
                     message=f"开始流式查询商品信息: {user_input[:50]}...",
                     details={
@@ -163,7 +164,7 @@ class ProductAgent:
             
             # 记录查询结果
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="PRODUCT_STREAM_COMPLETE",
                     message="商品信息流式查询完成",
                     details={
@@ -179,7 +180,7 @@ class ProductAgent:
             
             # 记录错误
             if self.logger_tool:
-                await self.logger_tool.log_system_event(
+                self.logger_tool.log_system_event(
                     event_type="PRODUCT_STREAM_ERROR",
                     message=error_msg,
                     details={
@@ -198,7 +199,7 @@ class ProductAgent:
         """获取商品信息"""
         try:
             # 首先检查Redis缓存
-            cache_key = f"product:{user_input}"
+            cache_key = f"product:{CommonTool.cache_key(user_input)}"
             cached_product = await self.redis_tool.get_cached_data(cache_key)
             if cached_product:
                 logger.info(f"从缓存获取商品信息: {cache_key}")
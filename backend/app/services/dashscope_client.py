@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+DashScope嵌入客户端 - 共享连接池
+功能：所有DashScopeEmbeddings实例通过同一个httpx连接池（可用时启用HTTP/2）调用嵌入接口，
+复用TLS连接，不再每次请求重新握手
+"""
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+from langchain_community.embeddings import DashScopeEmbeddings
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+# DashScope文本嵌入REST接口
+_EMBEDDING_URL = "https://dashscope.aliyuncs.com/api/v1/services/embeddings/text-embedding/text-embedding"
+
+# 进程内共享的HTTP客户端
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+
+def _get_http_client() -> httpx.Client:
+    """获取共享的httpx客户端，首次调用时创建；安装h2时启用HTTP/2多路复用"""
+    global _http_client
+
+    if _http_client is not None:
+        return _http_client
+
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                http2=h2 is not None,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+                timeout=10.0
+            )
+            logger.info(f"创建DashScope共享HTTP客户端 (HTTP/2: {h2 is not None})")
+        return _http_client
+
+
+class _EmbeddingResponse:
+    """与dashscope SDK响应一致的字段：status_code / output / code / message"""
+
+    def __init__(self, status_code: int, body: Dict[str, Any]):
+        self.status_code = status_code
+        self.output = body.get("output")
+        self.code = body.get("code", "")
+        self.message = body.get("message", "")
+
+
+class PooledTextEmbedding:
+    """
+    dashscope.TextEmbedding的替代实现
+
+    提供相同的call接口，由langchain的embed_with_retry照常完成25条分批和重试，
+    实际请求走共享连接池
+    """
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def call(self, model: str, input: Union[str, List[str]], text_type: str = "document", **kwargs) -> _EmbeddingResponse:
+        """调用文本嵌入接口"""
+        texts = [input] if isinstance(input, str) else list(input)
+        resp = _get_http_client().post(
+            _EMBEDDING_URL,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={
+                "model": model,
+                "input": {"texts": texts},
+                "parameters": {"text_type": text_type, **kwargs}
+            }
+        )
+        try:
+            body = resp.json()
+        except ValueError:
+            body = {"message": resp.text}
+        return _EmbeddingResponse(resp.status_code, body)
+
+
+def create_dashscope_embeddings(api_key: str, model: str = "text-embedding-v2") -> DashScopeEmbeddings:
+    """
+    创建使用共享连接池的DashScopeEmbeddings
+
+    Args:
+        api_key: DashScope API密钥
+        model: 嵌入模型名称
+
+    Returns:
+        DashScopeEmbeddings实例，其client替换为PooledTextEmbedding
+    """
+    embeddings = DashScopeEmbeddings(model=model, dashscope_api_key=api_key)
+    embeddings.client = PooledTextEmbedding(api_key)
+    return embeddings
@@ -9,6 +9,8 @@ import re
 import json
 import uuid
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass, field
@@ -25,8 +27,15 @@ from langchain_text_splitters import (
     RecursiveCharacterTextSplitter,
     MarkdownHeaderTextSplitter
 )
-from langchain_community.embeddings import DashScopeEmbeddings
+from app.services.dashscope_client import create_dashscope_embeddings
 from langchain_core.documents import Document
+
+# 安装PyMuPDF时使用其C实现解析PDF，否则回退到纯Python的pypdf
+try:
+    import fitz  # noqa: F401
+    from langchain_community.document_loaders import PyMuPDFLoader as _PDFLoader
+except ImportError:
+    _PDFLoader = PyPDFLoader
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
     Distance, 
@@ -34,12 +43,52 @@ from qdrant_client.models import (
     PointStruct,
     Filter,
     FieldCondition,
-    MatchValue
+    MatchValue,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    QuantizationSearchParams,
+    HnswConfigDiff
 )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# HNSW索引参数：建图时的邻居数与候选集大小，以及查询时的候选集大小
+_HNSW_M = 32
+_HNSW_EF_CONSTRUCT = 200
+_HNSW_SEARCH_EF = 64
+
+# 按(host, port)共享的Qdrant客户端，避免每个向量存储实例各自建立连接池
+_CLIENTS: Dict[tuple, QdrantClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_client(host: str, port: int) -> QdrantClient:
+    """获取(host, port)对应的共享Qdrant客户端，首次调用时创建"""
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get((host, port))
+        if client is None:
+            client = QdrantClient(host=host, port=port, timeout=5.0)
+            _CLIENTS[(host, port)] = client
+        return client
+
+
+def invalidate_retrieval_cache(collection_name: str):
+    """
+    集合内容变化后调用，使RAG管道中该集合的缓存失效
+    
+    Args:
+        collection_name: 被修改的集合名称
+    """
+    try:
+        from app.utils.rag_pipeline import bump_retrieval_version
+        
+        bump_retrieval_version(collection_name)
+    except Exception as e:
+        logger.warning(f"更新检索缓存版本失败: {e}")
+
 @dataclass
 class DocumentMetadata:
     """文档元数据"""
@@ -56,7 +105,7 @@ class DocumentProcessor:
     """文档处理器 - 支持多种格式文档加载和切分"""
     
     SUPPORTED_FORMATS = {
-        ".pdf": PyPDFLoader,
+        ".pdf": _PDFLoader,
         ".txt": TextLoader,
         ".docx": Docx2txtLoader,
         ".csv": UnstructuredCSVLoader,
@@ -84,6 +133,17 @@ class DocumentProcessor:
         self.chunk_overlap = chunk_overlap
         self.embeddings = None
         
+        # 切分器与输入无关，初始化一次后复用
+        self._md_splitter = MarkdownHeaderTextSplitter(
+            headers_to_split_on=self.MARKDOWN_HEADERS
+        )
+        self._text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+            separators=["\n\n", "\n", "。", "！", "？", "；", " ", ""]
+        )
+        
         if not self.knowledge_dir.exists():
             self.knowledge_dir.mkdir(parents=True, exist_ok=True)
             logger.info(f"创建知识库目录: {self.knowledge_dir}")
@@ -91,10 +151,7 @@ class DocumentProcessor:
         api_key = os.getenv("BAILIAN_API_KEY")
         if api_key:
             print("向量模型key")
-            self.embeddings = DashScopeEmbeddings(
-                dashscope_api_key=api_key,
-                model="text-embedding-v2"
-            )
+            self.embeddings = create_dashscope_embeddings(api_key, model="text-embedding-v2")
         else:
             logger.warning("未找到BAILIAN_API_KEY环境变量，将使用模拟嵌入")
     
@@ -280,9 +337,7 @@ class DocumentProcessor:
         if not markdown_docs:
             return non_markdown_docs
         
-        header_splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=self.MARKDOWN_HEADERS
-        )
+        header_splitter = self._md_splitter
         
         split_docs = []
         for doc in markdown_docs:
@@ -330,13 +385,7 @@ class DocumentProcessor:
             split_docs.extend(self.split_markdown_by_headers(markdown_docs))
         
         if other_docs:
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=self.chunk_size,
-                chunk_overlap=self.chunk_overlap,
-                length_function=len,
-                separators=["\n\n", "\n", "。", "！", "？", "；", " ", ""]
-            )
-            split_docs.extend(text_splitter.split_documents(other_docs))
+            split_docs.extend(self._text_splitter.split_documents(other_docs))
         
         for i, doc in enumerate(split_docs):
             doc.metadata["chunk_index"] = i
@@ -395,6 +444,7 @@ class QdrantVectorStore:
         self.client = None
         self.connected = False
         self.connect_error = None
+        self._embeddings = None
         
         # 尝试连接Qdrant
         self._connect()
@@ -404,7 +454,7 @@ class QdrantVectorStore:
         for attempt in range(self.max_retries):
             try:
                 logger.info(f"尝试连接到Qdrant服务器 (尝试 {attempt+1}/{self.max_retries}): {self.host}:{self.port}")
-                self.client = QdrantClient(host=self.host, port=self.port, timeout=5.0)
+                self.client = _get_client(self.host, self.port)
                 # 验证连接
                 self.client.get_collections()
                 self.connected = True
@@ -451,6 +501,18 @@ class QdrantVectorStore:
                     vectors_config=VectorParams(
                         size=self.vector_size,
                         distance=Distance.COSINE
+                    ),
+                    hnsw_config=HnswConfigDiff(
+                        m=_HNSW_M,
+                        ef_construct=_HNSW_EF_CONSTRUCT
+                    ),
+                    # int8标量量化：内存与搜索带宽降为FP32的1/4
+                    quantization_config=ScalarQuantization(
+                        scalar=ScalarQuantizationConfig(
+                            type=ScalarType.INT8,
+                            quantile=0.99,
+                            always_ram=True
+                        )
                     )
                 )
                 logger.info(f"创建集合: {self.collection_name}")
@@ -466,50 +528,112 @@ class QdrantVectorStore:
             embeddings: 嵌入模型
             batch_size: 批量处理大小
         """
-        if not self._ensure_connection():
-            return []
-            
         if not documents:
             logger.warning("没有文档需要添加")
             return []
         
-        points = []
-        for i, doc in enumerate(documents):
+        texts = [doc.page_content for doc in documents]
+        metadatas = [
+            {
+                "source": doc.metadata.get("source", ""),
+                "file_type": doc.metadata.get("file_type", ""),
+                "section": doc.metadata.get("section", ""),
+                "headers": doc.metadata.get("headers", []),
+                "chunk_index": doc.metadata.get("chunk_index", 0),
+                "total_chunks": doc.metadata.get("total_chunks", 1),
+                "processed_at": doc.metadata.get("processed_at", "")
+            }
+            for doc in documents
+        ]
+        return self.add_texts_batch(texts, metadatas, embeddings, batch_size)
+    
+    def add_texts_batch(
+        self,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings,
+        batch_size: int = 64,
+        upsert_batch_size: int = 256,
+        ids: Optional[List[str]] = None
+    ) -> int:
+        """
+        批量添加文本到向量存储，每批只发起一次嵌入请求，点按upsert_batch_size批量写入
+        
+        Args:
+            texts: 文本列表
+            metadatas: 与文本一一对应的元数据
+            embeddings: 嵌入模型
+            batch_size: 每次嵌入请求的文本数
+            upsert_batch_size: 每次upsert的点数
+            ids: 与文本一一对应的点ID，不指定则自动生成
+            
+        Returns:
+            成功写入的数量
+        """
+        if not self._ensure_connection():
+            return 0
+        
+        if not texts:
+            return 0
+        
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+        
+        starts = range(0, len(texts), batch_size)
+        
+        def flush(points: List[PointStruct], wait: bool) -> int:
             try:
-                vector = embeddings.embed_query(doc.page_content)
-                point = PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=vector,
-                    payload={
-                        "page_content": doc.page_content,
-                        "source": doc.metadata.get("source", ""),
-                        "file_type": doc.metadata.get("file_type", ""),
-                        "section": doc.metadata.get("section", ""),
-                        "headers": doc.metadata.get("headers", []),
-                        "chunk_index": doc.metadata.get("chunk_index", 0),
-                        "total_chunks": doc.metadata.get("total_chunks", 1),
-                        "processed_at": doc.metadata.get("processed_at", "")
-                    }
+                self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=points,
+                    wait=wait
                 )
-                points.append(point)
+                return len(points)
+            except Exception as e:
+                logger.error(f"写入 {len(points)} 个文档片段时出错: {e}")
+                return 0
+        
+        # 并发多批嵌入以重叠网络往返；按提交顺序写入
+        added = 0
+        pending: List[PointStruct] = []
+        with ThreadPoolExecutor(max_workers=min(4, len(starts))) as executor:
+            futures = [
+                executor.submit(embeddings.embed_documents, texts[start:start + batch_size])
+                for start in starts
+            ]
+            for i, (start, future) in enumerate(zip(starts, futures)):
+                try:
+                    vectors = future.result()
+                except Exception as e:
+                    logger.error(f"处理文档批次 {i} 时出错: {e}")
+                    continue
                 
-                if len(points) >= batch_size:
-                    self.client.upsert(
-                        collection_name=self.collection_name,
-                        points=points
+                pending.extend(
+                    PointStruct(
+                        id=point_id,
+                        vector=vector,
+                        payload={"page_content": text, **metadata}
                     )
-                    points = []
-                    
-            except Exception as e:
-                logger.error(f"处理文档片段 {i} 时出错: {e}")
+                    for point_id, text, metadata, vector in zip(
+                        ids[start:start + batch_size],
+                        texts[start:start + batch_size],
+                        metadatas[start:start + batch_size],
+                        vectors
+                    )
+                )
+                # 中间批次不等待服务端落盘；保留余量留给最后一次阻塞写入
+                while len(pending) > upsert_batch_size:
+                    added += flush(pending[:upsert_batch_size], wait=False)
+                    pending = pending[upsert_batch_size:]
         
-        if points:
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=points
-            )
+        if pending:
+            # 最后一批等待写入完成，返回时此前的写入也已可见
+            added += flush(pending, wait=True)
         
-        logger.info(f"成功添加 {len(documents)} 个文档片段到 {self.collection_name}")
+        if added:
+            invalidate_retrieval_cache(self.collection_name)
+        logger.info(f"成功添加 {added} 个文档片段到 {self.collection_name}")
+        return added
     
     def search(
         self, 
@@ -534,6 +658,27 @@ class QdrantVectorStore:
             return []
             
         query_vector = embeddings.embed_query(query)
+        return self.search_by_vector(query_vector, limit, filter_source)
+    
+    def search_by_vector(
+        self,
+        query_vector: List[float],
+        limit: int = 5,
+        filter_source: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        使用已计算好的查询向量搜索相关文档
+        
+        Args:
+            query_vector: 查询向量
+            limit: 返回结果数量
+            filter_source: 过滤源文件
+            
+        Returns:
+            搜索结果列表
+        """
+        if not self._ensure_connection():
+            return []
         
         filter_condition = None
         if filter_source:
@@ -547,7 +692,12 @@ class QdrantVectorStore:
             collection_name=self.collection_name,
             query_vector=query_vector,
             limit=limit,
-            query_filter=filter_condition
+            query_filter=filter_condition,
+            # 先用量化向量召回，再以原始向量重排，保证Top-K精度
+            search_params=SearchParams(
+                hnsw_ef=_HNSW_SEARCH_EF,
+                quantization=QuantizationSearchParams(rescore=True)
+            )
         )
         
         return [
@@ -576,24 +726,19 @@ class QdrantVectorStore:
             return []
         
         try:
-            from langchain_community.embeddings import DashScopeEmbeddings
-            import os
-            
-            # 初始化嵌入模型
-            api_key = (os.getenv("DASHSCOPE_API_KEY") or 
-                      os.getenv("BAILIAN_API_KEY") or 
-                      os.getenv("OPENAI_API_KEY"))
-            
-            if not api_key:
-                logger.error("未找到API密钥（DASHSCOPE_API_KEY/BAILIAN_API_KEY/OPENAI_API_KEY）")
-                return []
-            
-            embeddings = DashScopeEmbeddings(
-                model="text-embedding-v2",
-                dashscope_api_key=api_key
-            )
+            # 首次调用时初始化嵌入模型，之后复用
+            if self._embeddings is None:
+                api_key = (os.getenv("DASHSCOPE_API_KEY") or 
+                          os.getenv("BAILIAN_API_KEY") or 
+                          os.getenv("OPENAI_API_KEY"))
+                
+                if not api_key:
+                    logger.error("未找到API密钥（DASHSCOPE_API_KEY/BAILIAN_API_KEY/OPENAI_API_KEY）")
+                    return []
+                
+                self._embeddings = create_dashscope_embeddings(api_key, model="text-embedding-v2")
             
-            return self.search(query, embeddings, limit, filter_source)
+            return self.search(query, self._embeddings, limit, filter_source)
         except Exception as e:
             logger.error(f"知识库搜索失败: {e}")
             return []
@@ -615,6 +760,7 @@ class QdrantVectorStore:
                 ]
             )
         )
+        invalidate_retrieval_cache(self.collection_name)
         logger.info(f"删除源文件 {source} 的文档")
     
     def delete_collection(self):
@@ -625,6 +771,7 @@ class QdrantVectorStore:
             
         try:
             self.client.delete_collection(self.collection_name)
+            invalidate_retrieval_cache(self.collection_name)
             logger.info(f"删除集合: {self.collection_name}")
             return True
         except Exception as e:
@@ -649,6 +796,7 @@ class QdrantVectorStore:
                 collection_name=self.collection_name,
                 points_selector=[point_id]
             )
+            invalidate_retrieval_cache(self.collection_name)
             logger.info(f"删除 chunk: {point_id}")
             return True
         except Exception as e:
@@ -683,12 +831,36 @@ class QdrantVectorStore:
                 collection_name=self.collection_name,
                 points=points
             )
+            invalidate_retrieval_cache(self.collection_name)
             logger.info(f"更新 chunk: {point_id}")
             return True
         except Exception as e:
             logger.error(f"更新 chunk 失败: {e}")
             return False
     
+    def set_chunk_payload(self, point_id: str, payload: Dict[str, Any]):
+        """
+        覆盖单个chunk的部分payload字段，不重新嵌入
+        
+        Args:
+            point_id: chunk ID
+            payload: 要写入的字段
+            
+        Returns:
+            是否成功
+        """
+        try:
+            self.client.set_payload(
+                collection_name=self.collection_name,
+                payload=payload,
+                points=[point_id]
+            )
+            invalidate_retrieval_cache(self.collection_name)
+            return True
+        except Exception as e:
+            logger.error(f"更新 chunk payload 失败: {e}")
+            return False
+    
     def add_chunk(self, content: str, metadata: Dict[str, Any], embeddings, point_id: str = None):
         """
         添加单个chunk
@@ -719,6 +891,7 @@ class QdrantVectorStore:
                 collection_name=self.collection_name,
                 points=[point]
             )
+            invalidate_retrieval_cache(self.collection_name)
             logger.info(f"添加 chunk: {pid}")
             return pid
         except Exception as e:
@@ -767,6 +940,8 @@ class QdrantVectorStore:
             )
             old_name = self.collection_name
             self.collection_name = new_name
+            invalidate_retrieval_cache(old_name)
+            invalidate_retrieval_cache(new_name)
             logger.info(f"重命名集合: {old_name} -> {new_name}")
             return True
         except Exception as e:
@@ -839,6 +1014,7 @@ class KnowledgeBasePipeline:
             try:
                 self.vector_store.client.delete_collection(self.vector_store.collection_name)
                 self.vector_store._ensure_collection()
+                invalidate_retrieval_cache(self.vector_store.collection_name)
                 logger.info(f"已清除集合 {self.vector_store.collection_name} 的数据")
             except Exception as e:
                 logger.error(f"清除集合数据失败: {e}")
@@ -5,18 +5,25 @@ LLM配置管理 - 统一的LLM模型初始化
 """
 import os
 import logging
+import threading
+import functools
 from typing import Optional
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 
-# 加载.env文件
-load_dotenv()
-
 logger = logging.getLogger(__name__)
 
 # 全局单例实例
 _llm_instance: Optional[ChatOpenAI] = None
+_llm_lock = threading.Lock()
 _custom_llm_instances: dict = {}
+_custom_llm_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _ensure_env() -> bool:
+    """首次使用时加载.env文件，之后不再重复读取"""
+    load_dotenv()
+    return True
 
 def create_llm() -> Optional[ChatOpenAI]:
     """
@@ -30,6 +37,8 @@ def create_llm() -> Optional[ChatOpenAI]:
     if _llm_instance is not None:
         return _llm_instance
     
+    _ensure_env()
+    
     # 从环境变量读取配置
     api_key = os.getenv("OPENAI_API_KEY")
     base_url = os.getenv("OPENAI_BASE_URL")
@@ -44,15 +53,20 @@ def create_llm() -> Optional[ChatOpenAI]:
         return None
     
     try:
-        logger.info(f"初始化LLM模型: {model}")
-        _llm_instance = ChatOpenAI(
-            api_key=api_key,
-            model=model,
-            temperature=0.1,
-            base_url=base_url,
-            max_tokens=1000
-        )
-        return _llm_instance
+        # 双重检查锁：热路径只读取全局变量，仅首次创建时加锁
+        with _llm_lock:
+            if _llm_instance is not None:
+                return _llm_instance
+            
+            logger.info(f"初始化LLM模型: {model}")
+            _llm_instance = ChatOpenAI(
+                api_key=api_key,
+                model=model,
+                temperature=0.1,
+                base_url=base_url,
+                max_tokens=1000
+            )
+            return _llm_instance
     except Exception as e:
         logger.error(f"初始化LLM模型失败: {e}")
         return None
@@ -75,11 +89,14 @@ def create_llm_with_custom_config(
     返回:
         ChatOpenAI: 配置好的LLM实例
     """
-    # 生成配置键用于缓存
-    config_key = f"{model}_{temperature}_{max_tokens}_{str(sorted(kwargs.items()))}"
+    # 生成配置键用于缓存；kwargs可能含列表、字典等不可哈希的值（如stop、model_kwargs），按repr生成键
+    config_key = (model, temperature, max_tokens, repr(sorted(kwargs.items())))
     
-    if config_key in _custom_llm_instances:
-        return _custom_llm_instances[config_key]
+    instance = _custom_llm_instances.get(config_key)
+    if instance is not None:
+        return instance
+    
+    _ensure_env()
     
     # 从环境变量读取基础配置
     api_key = os.getenv("OPENAI_API_KEY")
@@ -98,17 +115,23 @@ def create_llm_with_custom_config(
     model_name = model if model else default_model
     
     try:
-        logger.info(f"初始化LLM模型: {model_name} (temperature={temperature})")
-        instance = ChatOpenAI(
-            api_key=api_key,
-            model=model_name,
-            temperature=temperature,
-            base_url=base_url,
-            max_tokens=max_tokens,
-            **kwargs
-        )
-        _custom_llm_instances[config_key] = instance
-        return instance
+        # 仅在缓存未命中时加锁，避免并发时重复创建客户端
+        with _custom_llm_lock:
+            instance = _custom_llm_instances.get(config_key)
+            if instance is not None:
+                return instance
+            
+            logger.info(f"初始化LLM模型: {model_name} (temperature={temperature})")
+            instance = ChatOpenAI(
+                api_key=api_key,
+                model=model_name,
+                temperature=temperature,
+                base_url=base_url,
+                max_tokens=max_tokens,
+                **kwargs
+            )
+            _custom_llm_instances[config_key] = instance
+            return instance
     except Exception as e:
         logger.error(f"初始化LLM模型失败: {e}")
         return None
@@ -127,6 +150,7 @@ def clear_llm_cache():
     清除LLM实例缓存（主要用于测试）
     """
     global _llm_instance, _custom_llm_instances
-    _llm_instance = None
-    _custom_llm_instances.clear()
+    with _llm_lock, _custom_llm_lock:
+        _llm_instance = None
+        _custom_llm_instances.clear()
     logger.info("LLM实例缓存已清除")
\ No newline at end of file
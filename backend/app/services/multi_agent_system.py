@@ -5,8 +5,6 @@
 
 重构说明：此文件现在作为模块入口点，重新导出重构后的Agent和工具类
 """
-import os
-import sys
 import json
 import time
 import logging
@@ -15,13 +13,6 @@ from datetime import datetime
 from enum import Enum
 from pydantic import BaseModel
 
-# 确保当前目录在Python路径中
-current_dir = os.path.dirname(os.path.abspath(__file__))
-if current_dir not in sys.path:
-    sys.path.insert(0, current_dir)
-
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # 导入共享类型
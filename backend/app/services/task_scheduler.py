@@ -4,17 +4,28 @@
 """
 import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Callable
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
+@dataclass(slots=True)
+class _ScheduledTask:
+    """已调度的定期任务"""
+    func: Callable
+    interval: float
+    args: Tuple[Any, ...] = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    last_run: Optional[float] = None  # 事件循环时间（loop.time()）
+
 class TaskScheduler:
     """任务调度器"""
     
     def __init__(self):
-        self.tasks = []
+        self.tasks: List[_ScheduledTask] = []
         self.running = False
+        # 持有任务的强引用，事件循环只保存弱引用
+        self._tasks: Set[asyncio.Task] = set()
         
     def schedule_task(self, task_func: Callable, interval_seconds: int, *args, **kwargs):
         """
@@ -25,13 +36,7 @@ class TaskScheduler:
             interval_seconds: 任务执行间隔（秒）
             *args, **kwargs: 传递给任务函数的参数
         """
-        self.tasks.append({
-            "func": task_func,
-            "interval": interval_seconds,
-            "args": args,
-            "kwargs": kwargs,
-            "last_run": None
-        })
+        self.tasks.append(_ScheduledTask(task_func, interval_seconds, args, kwargs))
         logger.info(f"已调度任务 {task_func.__name__}，间隔: {interval_seconds} 秒")
     
     async def start(self):
@@ -44,41 +49,40 @@ class TaskScheduler:
         
         # 为每个任务创建协程
         for task_info in self.tasks:
-            asyncio.create_task(self._run_task(task_info))
+            task = asyncio.create_task(self._run_task(task_info))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
     
     async def stop(self):
         """停止任务调度器"""
         self.running = False
+        
+        # 取消仍在运行的任务协程，避免停止后泄漏
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
         logger.info("任务调度器停止")
     
-    async def _run_task(self, task_info: dict):
+    async def _run_task(self, task_info: _ScheduledTask):
         """运行单个定期任务"""
+        loop = asyncio.get_running_loop()
+        interval = task_info.interval
+        task_name = task_info.func.__name__
+        
         while self.running:
+            started = loop.time()
             try:
-                # 计算下一次运行时间
-                interval = task_info["interval"]
-                last_run = task_info["last_run"]
-                now = datetime.now()
-                
-                # 如果任务从未运行过，或者已经超过间隔时间，则运行任务
-                if not last_run or (now - last_run).total_seconds() >= interval:
-                    logger.info(f"执行任务 {task_info['func'].__name__}...")
-                    await task_info["func"](*task_info["args"], **task_info["kwargs"])
-                    task_info["last_run"] = now
-                    logger.info(f"任务 {task_info['func'].__name__} 执行完成")
-                else:
-                    # 计算下次运行的剩余时间
-                    next_run = last_run + timedelta(seconds=interval)
-                    remaining = (next_run - now).total_seconds()
-                    logger.debug(f"任务 {task_info['func'].__name__} 将在 {remaining:.1f} 秒后运行")
-                
-                # 等待指定间隔时间
-                await asyncio.sleep(interval)
-                
+                logger.info(f"执行任务 {task_name}...")
+                await task_info.func(*task_info.args, **task_info.kwargs)
+                task_info.last_run = started
+                logger.info(f"任务 {task_name} 执行完成")
             except Exception as e:
                 logger.error(f"任务执行失败: {e}")
-                # 任务失败后，等待一个间隔再重试
-                await asyncio.sleep(task_info["interval"])
+            
+            # 扣除本次执行耗时，保证按固定间隔调度
+            await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
 
 # 创建全局调度器实例
 task_scheduler = TaskScheduler()
\ No newline at end of file
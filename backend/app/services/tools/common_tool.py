@@ -3,25 +3,96 @@
 通用工具 - 提供通用的工具函数
 """
 import os
-import sys
 import re
 import json
 import hashlib
 import uuid
 import time
+from collections import Counter
+from functools import lru_cache
 from typing import Dict, Any, Optional, List, Union
 from datetime import datetime, timedelta
 import logging
 
-# 确保当前目录在Python路径中
-current_dir = os.path.dirname(os.path.abspath(__file__))
-if current_dir not in sys.path:
-    sys.path.insert(0, current_dir)
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 预编译正则表达式，避免每次调用时查找re模块的编译缓存
+_ORDER_ID_RE = re.compile(r'^[A-Za-z0-9]{6,20}$')
+_PHONE_RE = re.compile(r'^1[3-9]\d{9}$')
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_WS_RE = re.compile(r'\s+')
+_CLEAN_RE = re.compile(r'[^\w\s\-.,!?！？。：]')
+_WORD_RE = re.compile(r'\w+')
+
+# 订单号提取模式（按优先级排列），带前缀的模式全部失败后才使用通用匹配
+_ORDER_EXTRACT_REGEXES = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'订单号[：:\s]*([A-Za-z0-9]{6,20})',
+    r'订单[：:\s]*([A-Za-z0-9]{6,20})',
+    r'Order[：:\s]*([A-Za-z0-9]{6,20})',
+    r'NO[：:\s]*([A-Za-z0-9]{6,20})',
+    r'([A-Za-z0-9]{6,20})'  # 通用匹配
+))
+
+# 手机号提取模式（按优先级排列）
+_PHONE_EXTRACT_REGEXES = tuple(re.compile(p) for p in (
+    r'手机号?[：:\s]*(\d{3}\*{4}\d{4})',
+    r'手机号?[：:\s]*(\d{11})',
+    r'联系电话[：:\s]*(\d{3}\*{4}\d{4})',
+    r'联系电话[：:\s]*(\d{11})',
+    r'电话[：:\s]*(\d{3}\*{4}\d{4})',
+    r'电话[：:\s]*(\d{11})'
+))
+
+# 校验手机号前需要去除的字符
+_PHONE_STRIP = str.maketrans('', '', '*-')
+
+# 哈希算法分派表，md5仅为向后兼容保留
+_HASHERS = {
+    'blake2b': lambda b: hashlib.blake2b(b, digest_size=16).hexdigest(),
+    'sha256': lambda b: hashlib.sha256(b).hexdigest(),
+    'md5': lambda b: hashlib.md5(b).hexdigest(),
+}
+if xxhash is not None:
+    _HASHERS['xxh3'] = lambda b: xxhash.xxh3_64(b).hexdigest()
+
+# 缓存键哈希密钥：跨进程稳定，BLAKE2b 密钥最长64字节
+_CACHE_HASH_KEY = os.getenv("CACHE_HASH_KEY", "default").encode('utf-8')[:64]
+
+# 关键词提取的停用词
+_STOP_WORDS = frozenset({'的', '了', '在', '是', '我', '你', '他', '她', '它', '们', '这', '那', '有', '没有', '不', '要'})
+
+# 工作时间判断结果按分钟缓存：[分钟序号, 结果]
+_BH_CACHE = [None, False]
+
+def json_dumps(obj: Any, default: Any = str) -> str:
+    """JSON序列化，优先使用orjson，未安装时回退到标准库"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, default=default)
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """JSON解析，优先使用orjson，未安装时回退到标准库"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+@lru_cache(maxsize=2048)
+def _parse_iso(value: str) -> datetime:
+    """解析ISO格式时间字符串，结果按输入缓存"""
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
+
 class CommonTool:
     """通用工具类"""
     
@@ -35,8 +106,7 @@ class CommonTool:
             return False
         
         # 简单的订单ID验证：包含字母数字，长度6-20
-        pattern = r'^[A-Za-z0-9]{6,20}$'
-        return bool(re.match(pattern, order_id))
+        return bool(_ORDER_ID_RE.match(order_id))
     
     def validate_phone_number(self, phone: str) -> bool:
         """验证手机号格式"""
@@ -44,8 +114,7 @@ class CommonTool:
             return False
         
         # 验证中国手机号格式
-        pattern = r'^1[3-9]\d{9}$'
-        return bool(re.match(pattern, phone.replace('*', '').replace('-', '')))
+        return bool(_PHONE_RE.match(phone.translate(_PHONE_STRIP)))
     
     def extract_order_id_from_text(self, text: str) -> Optional[str]:
         """从文本中提取订单号"""
@@ -53,16 +122,8 @@ class CommonTool:
             return None
         
         # 寻找订单号模式
-        patterns = [
-            r'订单号[：:\s]*([A-Za-z0-9]{6,20})',
-            r'订单[：:\s]*([A-Za-z0-9]{6,20})',
-            r'Order[：:\s]*([A-Za-z0-9]{6,20})',
-            r'NO[：:\s]*([A-Za-z0-9]{6,20})',
-            r'([A-Za-z0-9]{6,20})'  # 通用匹配
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _ORDER_EXTRACT_REGEXES:
+            match = pattern.search(text)
             if match:
                 order_id = match.group(1)
                 if self.validate_order_id(order_id):
@@ -76,17 +137,8 @@ class CommonTool:
             return None
         
         # 寻找手机号模式
-        patterns = [
-            r'手机[号号]?[：:\s]*(\d{3}\*{4}\d{4})',
-            r'手机[号号]?[：:\s]*(\d{11})',
-            r'联系电话[：:\s]*(\d{3}\*{4}\d{4})',
-            r'联系电话[：:\s]*(\d{11})',
-            r'电话[：:\s]*(\d{3}\*{4}\d{4})',
-            r'电话[：:\s]*(\d{11})'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
+        for pattern in _PHONE_EXTRACT_REGEXES:
+            match = pattern.search(text)
             if match:
                 phone = match.group(1)
                 if self.validate_phone_number(phone):
@@ -102,8 +154,8 @@ class CommonTool:
         return phone[:3] + '****' + phone[-4:]
     
     def generate_session_id(self) -> str:
-        """生成会话ID"""
-        return str(uuid.uuid4())
+        """生成会话ID（32位十六进制，不含连字符）"""
+        return uuid.uuid4().hex
     
     def generate_uuid(self) -> str:
         """生成UUID"""
@@ -113,7 +165,7 @@ class CommonTool:
         """格式化时间"""
         if isinstance(dt, str):
             try:
-                dt = datetime.fromisoformat(dt.replace('Z', '+00:00'))
+                dt = _parse_iso(dt)
             except:
                 return dt
         
@@ -126,13 +178,13 @@ class CommonTool:
         
         if isinstance(start_time, str):
             try:
-                start_time = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+                start_time = _parse_iso(start_time)
             except:
                 start_time = datetime.now()
         
         if isinstance(end_time, str):
             try:
-                end_time = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
+                end_time = _parse_iso(end_time)
             except:
                 end_time = datetime.now()
         
@@ -140,11 +192,16 @@ class CommonTool:
     
     def is_business_hours(self) -> bool:
         """检查是否在工作时间（9:00-18:00）"""
+        minute = int(time.time() // 60)
+        if _BH_CACHE[0] == minute:
+            return _BH_CACHE[1]
+        
         now = datetime.now()
-        current_hour = now.hour
         
         # 周一到周五，9:00-18:00
-        return 0 <= now.weekday() <= 4 and 9 <= current_hour < 18
+        result = 0 <= now.weekday() <= 4 and 9 <= now.hour < 18
+        _BH_CACHE[:] = [minute, result]
+        return result
     
     def format_price(self, price: Union[float, int], currency: str = "¥") -> str:
         """格式化价格"""
@@ -158,7 +215,16 @@ class CommonTool:
     
     def truncate_text(self, text: str, max_length: int = 100, suffix: str = "...") -> str:
         """截断文本"""
-        if not text or len(text) <= max_length:
+        if not text:
+            return text
+        
+        return self._truncate(text, max_length, suffix)
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _truncate(text: str, max_length: int, suffix: str) -> str:
+        """截断文本（按输入缓存，重复渲染的商品描述等可直接命中）"""
+        if len(text) <= max_length:
             return text
         
         return text[:max_length - len(suffix)] + suffix
@@ -169,10 +235,10 @@ class CommonTool:
             return ""
         
         # 去除多余空格和换行
-        text = re.sub(r'\s+', ' ', text.strip())
+        text = _WS_RE.sub(' ', text.strip())
         
         # 去除特殊字符
-        text = re.sub(r'[^\w\s\-.,!?！？。：]', '', text)
+        text = _CLEAN_RE.sub('', text)
         
         return text
     
@@ -182,49 +248,53 @@ class CommonTool:
             return []
         
         # 简单的关键词提取：去除停用词，获取频率最高的词
-        stop_words = {'的', '了', '在', '是', '我', '你', '他', '她', '它', '们', '这', '那', '有', '没有', '不', '要', '不'}
-        
-        # 分词（简单实现）
-        words = re.findall(r'\w+', text)
+        # 分词（简单实现），过滤停用词和短词后统计频率
+        word_freq = Counter(
+            word for word in _WORD_RE.findall(text)
+            if len(word) > 1 and word not in _STOP_WORDS
+        )
         
-        # 过滤停用词和短词
-        keywords = [word for word in words if len(word) > 1 and word not in stop_words]
-        
-        # 统计频率
-        word_freq = {}
-        for word in keywords:
-            word_freq[word] = word_freq.get(word, 0) + 1
-        
-        # 按频率排序
-        sorted_keywords = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-        
-        return [word for word, freq in sorted_keywords[:max_keywords]]
+        return [word for word, freq in word_freq.most_common(max_keywords)]
     
     def validate_email(self, email: str) -> bool:
         """验证邮箱格式"""
         if not email:
             return False
         
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        return bool(_EMAIL_RE.match(email))
     
-    def hash_string(self, text: str, algorithm: str = 'md5') -> str:
-        """计算字符串哈希值"""
+    def hash_string(self, text: str, algorithm: str = 'blake2b') -> str:
+        """
+        计算字符串哈希值
+        
+        支持 blake2b（默认）、sha256、xxh3（需安装xxhash）；md5 仅为向后兼容保留
+        """
         try:
-            if algorithm.lower() == 'md5':
-                return hashlib.md5(text.encode('utf-8')).hexdigest()
-            elif algorithm.lower() == 'sha256':
-                return hashlib.sha256(text.encode('utf-8')).hexdigest()
-            else:
+            hasher = _HASHERS.get(algorithm.lower())
+            if hasher is None:
                 raise ValueError(f"不支持的哈希算法: {algorithm}")
+            return hasher(text.encode('utf-8'))
         except Exception as e:
             self.logger.error(f"计算哈希失败: {e}")
             return ""
     
+    @staticmethod
+    def cache_key(*parts: Any) -> str:
+        """
+        根据任意片段生成稳定的缓存键（带密钥的BLAKE2b）
+        
+        与内置hash()不同，结果在不同进程间一致，可供多个worker共享缓存
+        """
+        h = hashlib.blake2b(key=_CACHE_HASH_KEY, digest_size=16)
+        for part in parts:
+            h.update(str(part).encode('utf-8'))
+            h.update(b'\x00')
+        return h.hexdigest()
+    
     def safe_json_loads(self, json_str: str, default: Any = None) -> Any:
         """安全的JSON解析"""
         try:
-            return json.loads(json_str)
+            return json_loads(json_str)
         except (json.JSONDecodeError, TypeError) as e:
             self.logger.debug(f"JSON解析失败: {e}")
             return default
@@ -232,7 +302,7 @@ class CommonTool:
     def safe_json_dumps(self, obj: Any, default: Any = None) -> str:
         """安全的JSON序列化"""
         try:
-            return json.dumps(obj, ensure_ascii=False, default=default or str)
+            return json_dumps(obj, default=default or str)
         except (TypeError, ValueError) as e:
             self.logger.debug(f"JSON序列化失败: {e}")
             return "{}"
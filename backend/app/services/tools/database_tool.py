@@ -2,16 +2,12 @@
 """
 数据库工具 - 提供数据库操作相关的工具函数
 """
-import os
-import sys
 import logging
+import types
+from itertools import islice
 from typing import Dict, Any, List, Optional
-import json
 
-# 确保当前目录在Python路径中
-current_dir = os.path.dirname(os.path.abspath(__file__))
-if current_dir not in sys.path:
-    sys.path.insert(0, current_dir)
+from .common_tool import json_dumps
 
 # 导入数据库管理器
 try:
@@ -20,10 +16,28 @@ except ImportError as e:
     logging.warning(f"导入mysql_manager失败: {e}")
     mysql_manager = None
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 模拟产品数据（只读，供数据库不可用时使用）
+_MOCK_PRODUCTS = (
+    types.MappingProxyType({
+        "product_id": "P001",
+        "name": "iPhone 15 Pro",
+        "category": "手机",
+        "price": 8999.00,
+        "specs": "256GB, 钛金色",
+        "description": "最新款iPhone，搭载A17芯片"
+    }),
+    types.MappingProxyType({
+        "product_id": "P002", 
+        "name": "MacBook Pro",
+        "category": "笔记本",
+        "price": 15999.00,
+        "specs": "16英寸, M3芯片",
+        "description": "专业级笔记本电脑"
+    })
+)
+
 class DatabaseTool:
     """数据库工具类"""
     
@@ -89,31 +103,13 @@ class DatabaseTool:
         try:
             if not self.db_manager:
                 # 模拟产品数据
-                mock_products = [
-                    {
-                        "product_id": "P001",
-                        "name": "iPhone 15 Pro",
-                        "category": "手机",
-                        "price": 8999.00,
-                        "specs": "256GB, 钛金色",
-                        "description": "最新款iPhone，搭载A17芯片"
-                    },
-                    {
-                        "product_id": "P002", 
-                        "name": "MacBook Pro",
-                        "category": "笔记本",
-                        "price": 15999.00,
-                        "specs": "16英寸, M3芯片",
-                        "description": "专业级笔记本电脑"
-                    }
-                ]
-                
-                if category:
-                    mock_products = [p for p in mock_products if p["category"] == category]
-                if keyword:
-                    mock_products = [p for p in mock_products if keyword in p["name"] or keyword in p["description"]]
-                
-                return mock_products[:limit]
+                matched = (
+                    p for p in _MOCK_PRODUCTS
+                    if (not category or p["category"] == category)
+                    and (not keyword or keyword in p["name"] or keyword in p["description"])
+                )
+                # 返回普通字典副本，调用方可自由修改和序列化
+                return [dict(p) for p in islice(matched, limit)]
             
             # 实际数据库查询
             query = """
@@ -134,20 +130,11 @@ class DatabaseTool:
             query += " LIMIT %s"
             params.append(limit)
             
-            result = await self.db_manager.execute_query(query, params)
+            result = await self.db_manager.execute_query(query, tuple(params))
             
             if result:
-                return [
-                    {
-                        "product_id": row[0],
-                        "name": row[1],
-                        "category": row[2],
-                        "price": float(row[3]),
-                        "specs": row[4],
-                        "description": row[5]
-                    }
-                    for row in result
-                ]
+                # row 是字典（DictCursor）
+                return [{**row, "price": float(row["price"])} for row in result]
             
             return []
             
@@ -163,32 +150,20 @@ class DatabaseTool:
                 self.logger.info("数据库管理器不可用，跳过保存AI回复")
                 return True
             
-            # 保存用户消息 - created_at字段有默认值CURRENT_TIMESTAMP，不需要显式传入
-            user_query = """
-            INSERT INTO chat_messages (user_id, session_id, message_type, content, 
-                                     message_metadata) 
-            VALUES (%s, %s, %s, %s, %s)
-            """
-            
-            # 保存AI回复 - created_at字段有默认值CURRENT_TIMESTAMP，不需要显式传入
-            ai_query = """
+            # 用户消息与AI回复合并为一条多行INSERT，一次往返写入
+            # created_at字段有默认值CURRENT_TIMESTAMP，不需要显式传入
+            query = """
             INSERT INTO chat_messages (user_id, session_id, message_type, content, 
                                      message_metadata) 
-            VALUES (%s, %s, %s, %s, %s)
+            VALUES (%s, %s, %s, %s, %s), (%s, %s, %s, %s, %s)
             """
             
-            metadata_json = json.dumps(metadata or {}, ensure_ascii=False)
-            
-            # 先保存用户消息
-            await self.db_manager.execute_query(
-                user_query, 
-                (user_id, session_id, 'user', user_message, metadata_json)
-            )
+            metadata_json = json_dumps(metadata or {})
             
-            # 再保存AI回复
             await self.db_manager.execute_query(
-                ai_query, 
-                (user_id, session_id, 'assistant', ai_message, metadata_json)
+                query, 
+                (user_id, session_id, 'user', user_message, metadata_json,
+                 user_id, session_id, 'assistant', ai_message, metadata_json)
             )
             
             self.logger.info(f"AI回复已保存: 用户{user_id}, 会话{session_id}")
@@ -234,14 +209,13 @@ class DatabaseTool:
             result = await self.db_manager.execute_query(query, (user_id, limit))
             
             if result:
+                # row 是字典（DictCursor）
                 return [
                     {
-                        "order_id": row[0],
-                        "status": row[1],
-                        "product_name": row[2],
-                        "price": float(row[3]),
-                        "order_date": row[4].isoformat() if hasattr(row[4], 'isoformat') else str(row[4]),
-                        "delivery_date": row[5].isoformat() if hasattr(row[5], 'isoformat') else str(row[5])
+                        **row,
+                        "price": float(row["price"]),
+                        "order_date": row["order_date"].isoformat() if hasattr(row["order_date"], 'isoformat') else str(row["order_date"]),
+                        "delivery_date": row["delivery_date"].isoformat() if hasattr(row["delivery_date"], 'isoformat') else str(row["delivery_date"])
                     }
                     for row in result
                 ]
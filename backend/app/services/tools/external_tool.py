@@ -3,23 +3,18 @@
 外部API工具模块
 功能：将外部API封装为LangChain Tool
 """
-import os
-import sys
 import asyncio
 import logging
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 from langchain_core.tools import tool
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from app.services.external_api import (
     get_logistics_service,
     get_logistics_status as get_logistics_status_api,
     track_package as track_package_api
 )
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class LogisticsTools:
@@ -3,21 +3,81 @@
 日志工具 - 提供日志记录相关的工具函数
 """
 import os
-import sys
+import queue
+import atexit
+import socket
 import logging
+import logging.handlers
 from typing import Dict, Any, Optional
-from datetime import datetime
 import json
 
-# 确保当前目录在Python路径中
-current_dir = os.path.dirname(os.path.abspath(__file__))
-if current_dir not in sys.path:
-    sys.path.insert(0, current_dir)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 主机名和进程号在模块加载时取一次，作为静态前缀写入格式串
+_HOSTNAME = socket.gethostname()
+_PID = os.getpid()
+_PREFIX = f"[{_HOSTNAME}:{_PID}] ".replace("%", "%%")
+
+# 后台写出日志的监听器，setup_queue_logging 调用后创建
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_queue_logging(level: int = logging.INFO) -> None:
+    """
+    配置根日志器经由队列输出（应用启动时调用一次）
+    
+    调用方只把记录放入队列，格式化和写出由后台监听线程完成。
+    直接替换根日志器的处理器，不受其他模块先调用basicConfig的影响。
+    
+    Args:
+        level: 根日志器级别
+    """
+    global _listener
+    
+    if _listener is not None:
+        return
+    
+    # 不记录线程/进程信息，省去每条日志的相关查询
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter(_PREFIX + "%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    
+    _listener = logging.handlers.QueueListener(
+        queue_handler.queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
+    
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level)
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 日志级别名称映射
+_LEVEL_MAP = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL
+}
+
+def _format_details(obj: Any) -> str:
+    """将日志详情序列化为缩进JSON，优先使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=str).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, indent=2, default=str)
+
 class LoggerTool:
     """日志工具类"""
     
@@ -26,165 +86,125 @@ class LoggerTool:
         self.logger = logger_instance or logger
         self.log_level = logging.INFO
         
-    async def log_system_event(self, event_type: str, message: str, 
-                              details: Dict[str, Any] = None, trace_id: str = None) -> None:
+    def log_system_event(self, event_type: str, message: str, 
+                         details: Dict[str, Any] = None, trace_id: str = None) -> None:
         """记录系统事件"""
         try:
-            log_entry = {
-                "timestamp": datetime.now().isoformat(),
-                "event_type": event_type,
-                "message": message,
-                "details": details or {},
-                "trace_id": trace_id
-            }
-            
-            self.logger.info(f"系统事件 [{event_type}]: {message}")
-            if details:
-                self.logger.debug(f"事件详情: {json.dumps(details, ensure_ascii=False, indent=2)}")
+            self.logger.info(f"系统事件 [{event_type}]: {message}", stacklevel=2)
+            if details and self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"事件详情: {_format_details(details)}", stacklevel=2)
                 
         except Exception as e:
             self.logger.error(f"记录系统事件失败: {e}")
     
-    async def log_user_interaction(self, user_id: str, session_id: str, 
-                                  user_input: str, agent_response: str,
-                                  metadata: Dict[str, Any] = None) -> None:
+    def log_user_interaction(self, user_id: str, session_id: str, 
+                             user_input: str, agent_response: str,
+                             metadata: Dict[str, Any] = None) -> None:
         """记录用户交互"""
         try:
-            log_entry = {
-                "timestamp": datetime.now().isoformat(),
-                "user_id": user_id,
-                "session_id": session_id,
-                "user_input": user_input,
-                "agent_response": agent_response,
-                "metadata": metadata or {}
-            }
+            self.logger.info(f"用户交互 [{user_id}]: {user_input[:50]}...", stacklevel=2)
             
-            self.logger.info(f"用户交互 [{user_id}]: {user_input[:50]}...")
-            self.logger.debug(f"交互详情: {json.dumps(log_entry, ensure_ascii=False, indent=2)}")
+            # 仅在DEBUG启用时构建并序列化交互详情
+            if self.logger.isEnabledFor(logging.DEBUG):
+                log_entry = {
+                    "user_id": user_id,
+                    "session_id": session_id,
+                    "user_input": user_input,
+                    "agent_response": agent_response,
+                    "metadata": metadata or {}
+                }
+                self.logger.debug(f"交互详情: {_format_details(log_entry)}", stacklevel=2)
             
         except Exception as e:
             self.logger.error(f"记录用户交互失败: {e}")
     
-    async def log_agent_action(self, agent_name: str, action: str, 
-                              input_data: str, output_data: str,
-                              success: bool = True, error_message: str = None) -> None:
+    def log_agent_action(self, agent_name: str, action: str, 
+                         input_data: str, output_data: str,
+                         success: bool = True, error_message: str = None) -> None:
         """记录Agent操作"""
         try:
-            log_entry = {
-                "timestamp": datetime.now().isoformat(),
-                "agent_name": agent_name,
-                "action": action,
-                "input_data": input_data[:200] + "..." if len(input_data) > 200 else input_data,
-                "output_data": output_data[:200] + "..." if len(output_data) > 200 else output_data,
-                "success": success,
-                "error_message": error_message
-            }
-            
             status = "成功" if success else "失败"
-            self.logger.info(f"Agent操作 [{agent_name} - {action}]: {status}")
+            self.logger.info(f"Agent操作 [{agent_name} - {action}]: {status}", stacklevel=2)
             
             if not success and error_message:
-                self.logger.error(f"Agent错误: {error_message}")
+                self.logger.error(f"Agent错误: {error_message}", stacklevel=2)
                 
         except Exception as e:
             self.logger.error(f"记录Agent操作失败: {e}")
     
-    async def log_performance_metrics(self, operation: str, duration: float,
-                                     metadata: Dict[str, Any] = None) -> None:
+    def log_performance_metrics(self, operation: str, duration: float,
+                                metadata: Dict[str, Any] = None) -> None:
         """记录性能指标"""
         try:
-            log_entry = {
-                "timestamp": datetime.now().isoformat(),
-                "operation": operation,
-                "duration_seconds": duration,
-                "metadata": metadata or {}
-            }
-            
-            self.logger.info(f"性能指标 [{operation}]: {duration:.3f}s")
+            self.logger.info(f"性能指标 [{operation}]: {duration:.3f}s", stacklevel=2)
+            if metadata and self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"性能详情: {_format_details(metadata)}", stacklevel=2)
             
             # 性能警告
             if duration > 5.0:
-                self.logger.warning(f"性能警告: {operation} 耗时 {duration:.3f}s")
+                self.logger.warning(f"性能警告: {operation} 耗时 {duration:.3f}s", stacklevel=2)
                 
         except Exception as e:
             self.logger.error(f"记录性能指标失败: {e}")
     
-    async def log_error(self, error_type: str, error_message: str, 
-                       context: Dict[str, Any] = None) -> None:
+    def log_error(self, error_type: str, error_message: str, 
+                  context: Dict[str, Any] = None) -> None:
         """记录错误信息"""
         try:
-            log_entry = {
-                "timestamp": datetime.now().isoformat(),
-                "error_type": error_type,
-                "error_message": error_message,
-                "context": context or {}
-            }
-            
-            self.logger.error(f"错误 [{error_type}]: {error_message}")
-            if context:
-                self.logger.debug(f"错误上下文: {json.dumps(context, ensure_ascii=False, indent=2)}")
+            self.logger.error(f"错误 [{error_type}]: {error_message}", stacklevel=2)
+            if context and self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"错误上下文: {_format_details(context)}", stacklevel=2)
                 
         except Exception as e:
             self.logger.error(f"记录错误失败: {e}")
     
     def set_log_level(self, level: str) -> None:
         """设置日志级别"""
-        try:
-            level_map = {
-                "DEBUG": logging.DEBUG,
-                "INFO": logging.INFO,
-                "WARNING": logging.WARNING,
-                "ERROR": logging.ERROR,
-                "CRITICAL": logging.CRITICAL
-            }
-            
-            if level.upper() in level_map:
-                self.log_level = level_map[level.upper()]
-                self.logger.setLevel(self.log_level)
-                
-        except Exception as e:
-            self.logger.error(f"设置日志级别失败: {e}")
+        log_level = _LEVEL_MAP.get(level.upper())
+        if log_level is not None:
+            self.log_level = log_level
+            self.logger.setLevel(log_level)
     
-    async def debug(self, message: str, details: Dict[str, Any] = None) -> None:
+    def debug(self, message: str, details: Dict[str, Any] = None) -> None:
         """调试日志"""
         try:
-            if details:
-                self.logger.debug(f"{message}: {json.dumps(details, ensure_ascii=False, indent=2)}")
+            if details and self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"{message}: {_format_details(details)}", stacklevel=2)
             else:
-                self.logger.debug(message)
+                self.logger.debug(message, stacklevel=2)
                 
         except Exception as e:
             self.logger.error(f"记录调试日志失败: {e}")
     
-    async def info(self, message: str, details: Dict[str, Any] = None) -> None:
+    def info(self, message: str, details: Dict[str, Any] = None) -> None:
         """信息日志"""
         try:
-            if details:
-                self.logger.info(f"{message}: {json.dumps(details, ensure_ascii=False, indent=2)}")
+            if details and self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(f"{message}: {_format_details(details)}", stacklevel=2)
             else:
-                self.logger.info(message)
+                self.logger.info(message, stacklevel=2)
                 
         except Exception as e:
             self.logger.error(f"记录信息日志失败: {e}")
     
-    async def warning(self, message: str, details: Dict[str, Any] = None) -> None:
+    def warning(self, message: str, details: Dict[str, Any] = None) -> None:
         """警告日志"""
         try:
-            if details:
-                self.logger.warning(f"{message}: {json.dumps(details, ensure_ascii=False, indent=2)}")
+            if details and self.logger.isEnabledFor(logging.WARNING):
+                self.logger.warning(f"{message}: {_format_details(details)}", stacklevel=2)
             else:
-                self.logger.warning(message)
+                self.logger.warning(message, stacklevel=2)
                 
         except Exception as e:
             self.logger.error(f"记录警告日志失败: {e}")
     
-    async def error(self, message: str, details: Dict[str, Any] = None) -> None:
+    def error(self, message: str, details: Dict[str, Any] = None) -> None:
         """错误日志"""
         try:
-            if details:
-                self.logger.error(f"{message}: {json.dumps(details, ensure_ascii=False, indent=2)}")
+            if details and self.logger.isEnabledFor(logging.ERROR):
+                self.logger.error(f"{message}: {_format_details(details)}", stacklevel=2)
             else:
-                self.logger.error(message)
+                self.logger.error(message, stacklevel=2)
                 
         except Exception as e:
             self.logger.error(f"记录错误日志失败: {e}")
\ No newline at end of file
@@ -2,17 +2,15 @@
 """
 Redis工具 - 提供Redis操作相关的工具函数
 """
-import os
-import sys
 import logging
 from typing import Dict, Any, Optional, List
 import json
 import time
 
-# 确保当前目录在Python路径中
-current_dir = os.path.dirname(os.path.abspath(__file__))
-if current_dir not in sys.path:
-    sys.path.insert(0, current_dir)
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # 导入Redis管理器
 try:
@@ -21,10 +19,16 @@ except ImportError as e:
     logging.warning(f"导入redis_manager失败: {e}")
     redis_manager = None
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
+from .common_tool import json_loads
+
 logger = logging.getLogger(__name__)
 
+def _dumps(value: Any) -> bytes:
+    """序列化为UTF-8字节，直接写入Redis；优先使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, default=str).encode('utf-8')
+
 class RedisTool:
     """Redis工具类"""
     
@@ -44,7 +48,7 @@ class RedisTool:
             data = await self.redis_client.get_async(key)
             
             if data:
-                return json.loads(data)
+                return json_loads(data)
             
             return None
             
@@ -60,7 +64,7 @@ class RedisTool:
                 return False
             
             key = f"session:{session_id}"
-            data_json = json.dumps(data, ensure_ascii=False, default=str)
+            data_json = _dumps(data)
             
             await self.redis_client.setex_async(key, expire_seconds, data_json)
             
@@ -97,7 +101,7 @@ class RedisTool:
             data = await self.redis_client.get_async(key)
             
             if data:
-                return json.loads(data)
+                return json_loads(data)
             
             return None
             
@@ -113,7 +117,7 @@ class RedisTool:
                 return False
             
             key = f"user_context:{user_id}"
-            context_json = json.dumps(context, ensure_ascii=False, default=str)
+            context_json = _dumps(context)
             
             await self.redis_client.setex_async(key, expire_seconds, context_json)
             
@@ -148,7 +152,7 @@ class RedisTool:
             data = await self.redis_client.get_async(key)
             
             if data:
-                return json.loads(data)
+                return json_loads(data)
             
             return None
             
@@ -163,7 +167,7 @@ class RedisTool:
                 self.logger.warning("Redis客户端未初始化")
                 return False
             
-            value_json = json.dumps(value, ensure_ascii=False, default=str)
+            value_json = _dumps(value)
             
             await self.redis_client.setex_async(key, expire_seconds, value_json)
             
@@ -180,7 +184,7 @@ class RedisTool:
             if not self.redis_client:
                 return False
             
-            value_json = json.dumps(value, ensure_ascii=False, default=str)
+            value_json = _dumps(value)
             
             await self.redis_client.setex_async(key, expire_seconds, value_json)
             
@@ -191,6 +195,42 @@ class RedisTool:
             self.logger.error(f"设置缓存失败: {e}")
             return False
     
+    async def mget_cached(self, keys: List[str]) -> List[Optional[Any]]:
+        """批量获取缓存数据，未命中的位置返回None"""
+        try:
+            if not self.redis_client:
+                return [None] * len(keys)
+            
+            values = await self.redis_client.mget_async(keys)
+            return [json_loads(data) if data else None for data in values]
+            
+        except Exception as e:
+            self.logger.error(f"批量获取缓存失败: {e}")
+            return [None] * len(keys)
+    
+    async def mset_cache(self, mapping: Dict[str, Any], expire_seconds: int = 300) -> bool:
+        """批量设置缓存数据，一次往返写入所有键"""
+        try:
+            if not self.redis_client:
+                return False
+            
+            payload = {key: _dumps(value) for key, value in mapping.items()}
+            result = await self.redis_client.setex_many_async(payload, expire_seconds)
+            
+            self.logger.debug(f"批量缓存数据已设置: {len(payload)} 个键")
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"批量设置缓存失败: {e}")
+            return False
+    
+    async def get_session_and_context(self, session_id: str, user_id: str) -> Dict[str, Optional[Dict[str, Any]]]:
+        """一次往返同时获取会话数据和用户上下文"""
+        session_data, user_context = await self.mget_cached(
+            [f"session:{session_id}", f"user_context:{user_id}"]
+        )
+        return {"session": session_data, "user_context": user_context}
+    
     async def delete_cache(self, key: str) -> bool:
         """删除缓存数据"""
         try:
@@ -4,23 +4,187 @@
 功能：加载文档 → 切分 → 向量化 → 存储到Qdrant
 """
 import os
+import re
+import asyncio
 import sys
+import hashlib
+import functools
+import threading
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
 from pathlib import Path
+import numpy as np
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import DashScopeEmbeddings
+from langchain_core.documents import Document
 import logging
 from dotenv import load_dotenv
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# 安装PyMuPDF时使用其C实现解析PDF，否则回退到纯Python的pypdf
+try:
+    import fitz  # noqa: F401
+    from langchain_community.document_loaders import PyMuPDFLoader as _PDFLoader
+except ImportError:
+    _PDFLoader = PyPDFLoader
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _digest16(text):
+    """生成16字节的确定性摘要（非加密用途）；xxh3直接接受str，无需先encode"""
+    if xxhash is not None:
+        return xxhash.xxh3_128_digest(text)
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+# 切分边界：段落、换行、句号、空格（一次编译，由re在C层扫描）
+_SEPARATOR_RE = re.compile(r"\n\n|\n|。| ")
+
+
+def _split_text(text, chunk_size, chunk_overlap):
+    """
+    按分隔符边界切分文本，并合并为带重叠的片段
+
+    Args:
+        text: 待切分文本
+        chunk_size: 片段最大长度
+        chunk_overlap: 相邻片段的最大重叠长度
+
+    Returns:
+        片段文本列表
+    """
+    # 分隔符保留在所属片段末尾
+    pieces = []
+    start = 0
+    for match in _SEPARATOR_RE.finditer(text):
+        pieces.append(text[start:match.end()])
+        start = match.end()
+    pieces.append(text[start:])
+
+    chunks = []
+    window = deque()
+    length = 0
+    for piece in pieces:
+        # 超长片段按chunk_size硬切
+        for i in range(0, len(piece), chunk_size):
+            part = piece[i:i + chunk_size]
+            if window and length + len(part) > chunk_size:
+                chunk = "".join(window).strip()
+                if chunk:
+                    chunks.append(chunk)
+                # 保留末尾不超过chunk_overlap的片段作为重叠
+                while window and (length > chunk_overlap or length + len(part) > chunk_size):
+                    length -= len(window.popleft())
+            window.append(part)
+            length += len(part)
+
+    chunk = "".join(window).strip()
+    if chunk:
+        chunks.append(chunk)
+
+    return chunks
+
+
+def _max_fit(limit, fits):
+    """
+    倍增后二分，求满足fits(k)的最大k
+
+    Args:
+        limit: k的上限
+        fits: 关于k单调的判定函数（k越小越容易满足）
+
+    Returns:
+        满足条件的最大k，均不满足时返回0
+    """
+    lo, hi = 0, 1
+    while hi <= limit and fits(hi):
+        lo, hi = hi, hi * 2
+    hi = min(hi, limit + 1)
+
+    # 不变式：fits(lo)成立，hi不成立或越界
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if fits(mid):
+            lo = mid
+        else:
+            hi = mid
+
+    return lo
+
+
+class _BinarySearchChunker:
+    """
+    按任意长度函数（如分词器的token数）切分文本
+
+    每个片段的长度只需O(log n)次length_fn调用即可确定，
+    避免逐个合并小片段时反复计算长度
+    """
+
+    def __init__(self, length_fn, chunk_size, chunk_overlap=0):
+        self.length_fn = length_fn
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split_text(self, text):
+        chunks = []
+        start = 0
+        n = len(text)
+
+        while start < n:
+            size = _max_fit(n - start, lambda k: self.length_fn(text[start:start + k]) <= self.chunk_size)
+            end = start + max(size, 1)
+
+            # 尽量回退到最后一个分隔符边界
+            if end < n:
+                boundary = start
+                for match in _SEPARATOR_RE.finditer(text, start, end):
+                    boundary = match.end()
+                if boundary > start:
+                    end = boundary
+
+            chunk = text[start:end].strip()
+            if chunk:
+                chunks.append(chunk)
+            if end >= n:
+                break
+
+            overlap = _max_fit(end - start - 1, lambda k: self.length_fn(text[end - k:end]) <= self.chunk_overlap)
+            start = end - overlap
+
+        return chunks
+
+
+_LOADERS = {
+    ".pdf": _PDFLoader,
+    ".txt": TextLoader
+}
+
+
+def _load_file(file_path):
+    """使用对应的加载器加载单个文件（模块级函数，便于在子进程中执行）"""
+    loader_class = _LOADERS[file_path.suffix]
+    if file_path.suffix == ".pdf":
+        loader = loader_class(str(file_path))
+    else:
+        loader = loader_class(str(file_path), encoding='utf-8')
+
+    return loader.load()
+
+
 class DocumentIngestor:
     """文档摄取器类"""
 
+    LOADERS = _LOADERS
+
     def __init__(self, knowledge_dir="knowledge", collection_name="policy_documents"):
         """
         初始化文档摄取器
@@ -40,35 +204,72 @@ class DocumentIngestor:
             logger.warning("未找到BAILIAN_API_KEY环境变量")
             logger.warning("将使用模拟嵌入进行演示")
 
-    def load_documents(self):
-        """加载所有支持的文档"""
-        documents = []
-
-        loaders = {
-            ".pdf": PyPDFLoader,
-            ".txt": TextLoader
+    def _list_files(self):
+        """列出知识目录中所有支持的文件"""
+        return [
+            file_path for file_path in self.knowledge_dir.iterdir()
+            if file_path.is_file() and file_path.suffix in self.LOADERS
+        ]
+
+    def _stamp_metadata(self, file_path, docs):
+        """为同一文件的文档补充元数据，保留加载器给出的页码等字段"""
+        metadata = {
+            "source": file_path.name,
+            "file_type": file_path.suffix,
+            "file_path": str(file_path)
         }
+        for doc in docs:
+            doc.metadata.update(metadata)
 
-        for file_path in self.knowledge_dir.iterdir():
-            if file_path.is_file() and file_path.suffix in loaders:
-                try:
-                    logger.info(f"正在加载文档: {file_path.name}")
+        return docs
+
+    def _submit_loads(self, stack, files):
+        """
+        提交文件加载任务：PDF解析为CPU密集型，交给进程池；文本文件为IO密集型，交给线程池
 
-                    loader_class = loaders[file_path.suffix]
-                    if file_path.suffix == ".pdf":
-                        loader = loader_class(str(file_path))
-                    else:
-                        loader = loader_class(str(file_path), encoding='utf-8')
+        Args:
+            stack: 管理执行器生命周期的ExitStack
+            files: 待加载的文件列表
+
+        Returns:
+            按文件顺序排列的 {future: file_path}
+        """
+        pdf_count = sum(1 for file_path in files if file_path.suffix == ".pdf")
+        txt_count = len(files) - pdf_count
+
+        pools = {}
+        if pdf_count:
+            pools[".pdf"] = stack.enter_context(
+                ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, pdf_count))
+            )
+        if txt_count:
+            pools[".txt"] = stack.enter_context(
+                ThreadPoolExecutor(max_workers=min(8, txt_count))
+            )
+
+        futures = {}
+        for file_path in files:
+            logger.info(f"正在加载文档: {file_path.name}")
+            pool = pools[".pdf" if file_path.suffix == ".pdf" else ".txt"]
+            futures[pool.submit(_load_file, file_path)] = file_path
+
+        return futures
+
+    def load_documents(self):
+        """加载所有支持的文档（PDF多进程、文本多线程并行解析）"""
+        documents = []
 
-                    docs = loader.load()
+        files = self._list_files()
+        if not files:
+            return documents
 
-                    for doc in docs:
-                        doc.metadata = {
-                            "source": file_path.name,
-                            "file_type": file_path.suffix,
-                            "file_path": str(file_path)
-                        }
+        with ExitStack() as stack:
+            futures = self._submit_loads(stack, files)
 
+            # 按提交顺序收集结果，保证文档顺序稳定
+            for future, file_path in futures.items():
+                try:
+                    docs = self._stamp_metadata(file_path, future.result())
                     documents.extend(docs)
                     logger.info(f"成功加载 {len(docs)} 个文档片段")
 
@@ -77,16 +278,50 @@ class DocumentIngestor:
 
         return documents
 
-    def split_documents(self, documents, chunk_size=500, chunk_overlap=50):
-        """切分文档为较小的片段"""
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", "。", " ", ""]
-        )
+    def iter_documents(self):
+        """按加载完成的先后逐个产出文档页，不在内存中保留全部文档"""
+        files = self._list_files()
+        if not files:
+            return
+
+        with ExitStack() as stack:
+            futures = self._submit_loads(stack, files)
+
+            for future in as_completed(futures):
+                file_path = futures.pop(future)
+                try:
+                    docs = self._stamp_metadata(file_path, future.result())
+                except Exception as e:
+                    logger.error(f"加载文档 {file_path.name} 时出错: {e}")
+                    continue
+
+                logger.info(f"成功加载 {file_path.name}: {len(docs)} 个文档片段")
+                yield from docs
+
+    def iter_split(self, docs_iter, chunk_size=500, chunk_overlap=50, length_function=len):
+        """逐个消费文档并产出切分后的片段"""
+        split_text = self._text_splitter(chunk_size, chunk_overlap, length_function)
+        for doc in docs_iter:
+            for chunk in split_text(doc.page_content):
+                yield Document(page_content=chunk, metadata=dict(doc.metadata))
+
+    def _text_splitter(self, chunk_size, chunk_overlap, length_function):
+        """按长度函数选择切分方式：字符数走正则切分，其他长度函数走二分查找切分"""
+        if length_function is len:
+            return functools.partial(_split_text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        return _BinarySearchChunker(length_function, chunk_size, chunk_overlap).split_text
 
-        split_docs = text_splitter.split_documents(documents)
+    def split_documents(self, documents, chunk_size=500, chunk_overlap=50, length_function=len):
+        """
+        切分文档为较小的片段
+
+        Args:
+            documents: 文档列表
+            chunk_size: 片段最大长度（以length_function计）
+            chunk_overlap: 相邻片段的最大重叠长度
+            length_function: 长度函数，默认按字符数；传入分词器计数时改用二分查找切分
+        """
+        split_docs = list(self.iter_split(documents, chunk_size, chunk_overlap, length_function))
         logger.info(f"文档切分为 {len(split_docs)} 个片段")
 
         return split_docs
@@ -95,21 +330,27 @@ class DocumentIngestor:
         """创建嵌入模型"""
         if self.api_key:
             try:
-                embeddings = DashScopeEmbeddings(
-                    model="text-embedding-v2",
-                    dashscope_api_key=self.api_key
-                )
+                from app.services.dashscope_client import create_dashscope_embeddings
+
+                embeddings = create_dashscope_embeddings(self.api_key, model="text-embedding-v2")
                 logger.info("使用DashScopeEmbeddings创建嵌入模型")
                 logger.info("API密钥长度: " + str(len(self.api_key)))
-                return embeddings
+                return CachedEmbeddings(embeddings)
             except Exception as e:
                 logger.error(f"创建DashScopeEmbeddings时出错: {e}")
 
         logger.warning("使用模拟嵌入进行演示")
         return MockEmbeddings()
 
-    def create_vectorstore(self, documents):
-        """创建向量数据库"""
+    def create_vectorstore(self, documents, batch_size=64):
+        """
+        创建向量数据库
+
+        Args:
+            documents: 切分后的文档列表
+            batch_size: 每批嵌入的片段数（DashScope text-embedding-v2单次上限为25，
+                        嵌入模型内部会再按上限拆分）
+        """
         from app.services.knowledge_base import QdrantVectorStore
 
         embeddings = self.create_embeddings()
@@ -117,47 +358,123 @@ class DocumentIngestor:
         qdrant_store = QdrantVectorStore(
             collection_name=self.collection_name
         )
+        if not qdrant_store.connected:
+            raise RuntimeError(f"无法连接到Qdrant，集合 {self.collection_name} 未写入: {qdrant_store.connect_error}")
 
-        for doc in documents:
-            qdrant_store.add_text(
-                text=doc.page_content,
-                metadata=doc.metadata
-            )
+        # 批量嵌入并写入，避免逐片段发起请求
+        self._write_batch(qdrant_store, documents, embeddings, batch_size)
+        # 检索复用同一个（带缓存的）嵌入模型
+        qdrant_store._embeddings = embeddings
 
         logger.info(f"成功创建Qdrant向量数据库，集合名称: {self.collection_name}")
         self.vectorstore = qdrant_store
-        return vectorstore
+        return self.vectorstore
+
+    def _write_batch(self, qdrant_store, documents, embeddings, batch_size, written=None):
+        """
+        将一批切分后的文档去重、嵌入并写入Qdrant
+
+        内容完全相同的片段只嵌入一次，所有来源的元数据保存在payload的sources中
+
+        Args:
+            qdrant_store: 目标向量存储
+            documents: 切分后的文档
+            embeddings: 嵌入模型
+            batch_size: 每次嵌入请求的文本数
+            written: 跨批次共享的 {内容摘要: (点ID, sources)}，为None时只在本批内去重；
+                     之前批次已写入的内容再次出现时，把元数据追加到该点的sources
+
+        Returns:
+            新写入的片段数
+        """
+        grouped = {}
+        updated = {}
+        for doc in documents:
+            key = _digest16(doc.page_content)
+            if written is not None and key in written:
+                point_id, sources = written[key]
+                sources.append(doc.metadata)
+                updated[point_id] = sources
+                continue
+            grouped.setdefault(key, (doc.page_content, []))[1].append(doc.metadata)
+
+        # 之前批次已写入的片段只更新来源，不重新嵌入
+        for point_id, sources in updated.items():
+            qdrant_store.set_chunk_payload(point_id, {"sources": sources})
+
+        duplicates = len(documents) - len(grouped)
+        if duplicates:
+            logger.info(f"合并 {duplicates} 个重复片段")
+
+        ids = [str(uuid.uuid4()) for _ in grouped]
+        texts = [text for text, _ in grouped.values()]
+        metadatas = [{**metas[0], "sources": list(metas)} for _, metas in grouped.values()]
+        if written is not None:
+            for point_id, (key, (_, metas)) in zip(ids, grouped.items()):
+                written[key] = (point_id, metas)
+        return qdrant_store.add_texts_batch(texts, metadatas, embeddings, batch_size=batch_size, ids=ids)
+
+    def ingest_all(self, batch_size=64):
+        """
+        执行完整的文档摄取流程
+
+        文件在后台进程/线程中加载，主线程对已加载完成的文件逐页切分，
+        并按batch_size分批向量化写入，使加载、切分、向量化相互重叠
+
+        Args:
+            batch_size: 每批向量化写入的片段数
+        """
+        from app.services.knowledge_base import QdrantVectorStore
 
-    def ingest_all(self):
-        """执行完整的文档摄取流程"""
         logger.info("开始文档摄取流程...")
 
-        logger.info("步骤1: 加载文档")
-        documents = self.load_documents()
-        if not documents:
+        files = self._list_files()
+        if not files:
             logger.error("未找到任何可加载的文档")
             return None
 
-        logger.info("步骤2: 切分文档")
-        split_docs = self.split_documents(documents)
+        embeddings = self.create_embeddings()
+        qdrant_store = QdrantVectorStore(
+            collection_name=self.collection_name
+        )
+        if not qdrant_store.connected:
+            raise RuntimeError(f"无法连接到Qdrant，集合 {self.collection_name} 未写入: {qdrant_store.connect_error}")
+
+        # 流式处理：内存中只保留当前文件和一个待写入批次
+        pending = []
+        written = {}
+        total = 0
+        for chunk in self.iter_split(self.iter_documents()):
+            pending.append(chunk)
+            if len(pending) >= batch_size:
+                total += self._write_batch(qdrant_store, pending, embeddings, batch_size, written)
+                pending = []
+
+        if pending:
+            total += self._write_batch(qdrant_store, pending, embeddings, batch_size, written)
+
+        if not total:
+            logger.error("未找到任何可加载的文档")
+            return None
 
-        logger.info("步骤3: 创建向量数据库")
-        self.create_vectorstore(split_docs)
+        # 检索复用同一个（带缓存的）嵌入模型
+        qdrant_store._embeddings = embeddings
+        self.vectorstore = qdrant_store
 
-        logger.info("文档摄取完成！")
+        logger.info(f"文档摄取完成！共写入 {total} 个片段，集合名称: {self.collection_name}")
         return self.vectorstore
 
-    def test_retrieval(self, query="退货政策", top_k=3):
-        """测试检索功能"""
+    async def test_retrieval(self, query="退货政策", top_k=3):
+        """测试检索功能（检索在线程中执行，多个查询可并发）"""
         if not self.vectorstore:
             logger.error("向量数据库未初始化")
             return None
 
         logger.info(f"测试检索: '{query}'")
-        results = self.vectorstore.search_knowledge(query, limit=top_k)
+        results = await asyncio.to_thread(self.vectorstore.search_knowledge, query, limit=top_k)
 
         for i, result in enumerate(results, 1):
-            logger.info(f"检索结果 {i}:")
+            logger.info(f"[{query}] 检索结果 {i}:")
             logger.info(f"内容: {result['content'][:100]}...")
             logger.info(f"来源: {result['source']}")
             logger.info(f"相似度: {result['score']}")
@@ -166,27 +483,89 @@ class DocumentIngestor:
         return results
 
 
-class MockEmbeddings:
-    """模拟嵌入类 - 生成1536维向量以匹配text-embedding-v2"""
+class CachedEmbeddings:
+    """带进程内LRU缓存的嵌入包装器，相同文本只请求一次"""
+
+    def __init__(self, inner, maxsize=2048):
+        """
+        Args:
+            inner: 被包装的嵌入模型
+            maxsize: 缓存的最大文本数
+        """
+        self.inner = inner
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, text):
+        with self._lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+            return vector
+
+    def _put(self, text, vector):
+        with self._lock:
+            self._cache[text] = vector
+            self._cache.move_to_end(text)
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
 
     def embed_query(self, text):
-        import hashlib
+        vector = self._get(text)
+        if vector is None:
+            vector = tuple(self.inner.embed_query(text))
+            self._put(text, vector)
+        return list(vector)
+
+    def embed_documents(self, texts):
+        # 批内去重，只对未命中的文本发起一次批量请求
+        vectors = {text: self._get(text) for text in texts}
+        missing = [text for text, vector in vectors.items() if vector is None]
+        if missing:
+            for text, vector in zip(missing, self.inner.embed_documents(missing)):
+                vector = tuple(vector)
+                vectors[text] = vector
+                self._put(text, vector)
+
+        return [list(vectors[text]) for text in texts]
+
 
-        hash_val = hashlib.md5(text.encode()).digest()
-        vector = []
+@functools.lru_cache(maxsize=1024)
+def _mock_embed(text):
+    """生成模拟嵌入向量，以不可变元组缓存"""
+    hash_val = _digest16(text)
 
-        for i in range(1536):
-            byte_val = hash_val[i % len(hash_val)]
-            value = (byte_val / 255.0) * 2 - 1
-            vector.append(value)
+    # 将16字节哈希循环填充到1536维，并映射到-1到1之间
+    buf = np.resize(np.frombuffer(hash_val, dtype=np.uint8), MockEmbeddings.DIMENSION)
+    vector = buf.astype(np.float32) * (2.0 / 255.0) - 1.0
 
-        return vector
+    return tuple(vector.tolist())
+
+
+class MockEmbeddings:
+    """模拟嵌入类 - 生成1536维向量以匹配text-embedding-v2"""
+
+    DIMENSION = 1536
+
+    def embed_query(self, text):
+        # 结果只由文本决定，重复查询直接命中缓存
+        return list(_mock_embed(text))
 
     def embed_documents(self, texts):
-        return [self.embed_query(text) for text in texts]
+        if not texts:
+            return []
+
+        # 一次性拼接所有哈希，在(N, 1536)矩阵上完成批量映射
+        digests = b"".join(_digest16(text) for text in texts)
+        hashes = np.frombuffer(digests, dtype=np.uint8).reshape(len(texts), -1)
+        buf = np.tile(hashes, (1, self.DIMENSION // hashes.shape[1]))
+        vectors = buf.astype(np.float32) * (2.0 / 255.0) - 1.0
 
+        return vectors.tolist()
 
-def main():
+
+async def main():
     """主函数"""
     ingestor = DocumentIngestor()
 
@@ -194,12 +573,15 @@ def main():
 
     if vectorstore:
         test_queries = ["退货政策", "客服时间", "退款流程"]
-        for query in test_queries:
+        all_results = await asyncio.gather(
+            *(ingestor.test_retrieval(query) for query in test_queries)
+        )
+        for query, results in zip(test_queries, all_results):
             print(f"\n=== 测试查询: {query} ===")
-            ingestor.test_retrieval(query)
+            print(f"检索到 {len(results or [])} 个结果")
 
         print("\n文档摄取完成！")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
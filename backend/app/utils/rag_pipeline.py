@@ -5,15 +5,25 @@ RAG管道实现 - 基于LangChain的检索增强生成系统
 """
 import os
 import sys
+import asyncio
+import hashlib
+import struct
 import logging
+import threading
 import time
+import weakref
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 from langchain_community.embeddings import DashScopeEmbeddings
+from langchain_community.embeddings.dashscope import embed_with_retry
 from app.services.llm_config import create_llm_with_custom_config
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from app.services.dashscope_client import create_dashscope_embeddings
+from app.services.tools.common_tool import CommonTool, json_dumps, json_loads
+from app.utils.ingest import MockEmbeddings
 from langchain.messages import HumanMessage, AIMessage
 from langchain_core.documents import Document
 import json
+import numpy as np
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -39,6 +49,227 @@ except ImportError as e:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 并发检索上限，避免压垮DashScope嵌入接口
+_MAX_CONCURRENT_RETRIEVALS = 32
+
+# RAG回答提示词模板，可通过环境变量RAG_PROMPT_TEMPLATE覆盖（需包含{query}和{context}）
+_PROMPT_TEMPLATE = os.getenv("RAG_PROMPT_TEMPLATE") or """你是客服助手，请根据以下政策文档回答用户问题。
+
+用户问题：{query}
+
+相关政策文档：
+{context}
+
+请遵循以下严格要求：
+1. 只能基于提供的文档内容回答问题
+2. 如果文档中没有相关信息，必须明确告知用户"未在知识库中找到相关内容"
+3. 严格禁止编造、推测或虚构任何不在文档中的信息
+4. 回答要专业、友好
+5. 引用具体的政策条款（如果有）
+6. 如果涉及具体操作指引，请详细说明（基于文档内容）
+
+回答："""
+
+# 带会话上下文的提示词模板（{context_prompt}为会话上下文提示词，{context}为文档上下文）
+_CONTEXT_PROMPT_TEMPLATE = """{context_prompt}
+
+基于以下相关政策文档回答：
+{context}
+
+请提供准确、专业的回答，并引用具体的政策条款。"""
+
+# 知识库文档数缓存有效期（秒）
+_DOC_COUNT_TTL = 60
+
+# 检索结果缓存有效期（秒）；知识库写入或删除后通过版本号整体失效
+_RETRIEVAL_CACHE_TTL = 3600
+
+# 传给LLM的文档上下文总字符上限，超出时按各文档长度比例截断，控制prefill开销
+_MAX_CONTEXT_CHARS = int(os.getenv("RAG_MAX_CONTEXT_CHARS", "3000"))
+
+# 查询向量缓存：进程内LRU容量与Redis过期时间（毫秒）
+_QUERY_EMBEDDING_CACHE_SIZE = 4096
+_QUERY_EMBEDDING_TTL_MS = 24 * 3600 * 1000
+
+
+def retrieval_version_key(collection_name: str) -> str:
+    """检索缓存版本号的Redis键"""
+    return f"rag_version:{collection_name}"
+
+
+# 本进程内的RAG管道实例，知识库更新时据此清除各实例的文档数缓存
+_PIPELINES = weakref.WeakSet()
+
+
+def bump_retrieval_version(collection_name: str):
+    """
+    知识库写入或删除后调用：递增集合版本号使已缓存的检索结果失效，
+    并清除本进程内同一集合RAG管道的文档数缓存
+    
+    Args:
+        collection_name: 被修改的Qdrant集合名称
+    """
+    for pipeline in list(_PIPELINES):
+        if pipeline.collection_name == collection_name:
+            pipeline.invalidate_stats()
+    
+    if redis_manager:
+        redis_manager.incr(retrieval_version_key(collection_name))
+
+
+def _truncate_contents(contents: List[str], max_chars: int = _MAX_CONTEXT_CHARS) -> List[str]:
+    """总长度超过max_chars时，按各文档长度占比分配字符预算并截断"""
+    total = sum(len(content) for content in contents)
+    if total <= max_chars:
+        return contents
+    return [content[:max_chars * len(content) // total] for content in contents]
+
+class EmbeddingBatcher:
+    """
+    嵌入请求微批合并器
+
+    在短时间窗口内收集并发到达的查询，合并为一次批量嵌入调用，
+    再把结果分发给各自等待的调用方
+    """
+    
+    def __init__(self, embed_fn, max_batch: int = 25, max_wait: float = 0.01):
+        """
+        Args:
+            embed_fn: 批量嵌入函数，输入文本列表，返回等长的向量列表
+            max_batch: 单批最大文本数（DashScope单次请求上限为25）
+            max_wait: 收集窗口（秒）
+        """
+        self.embed_fn = embed_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+    
+    async def embed(self, text: str) -> List[float]:
+        """提交单个文本，等待所在批次完成后返回其向量"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+    
+    async def _run(self):
+        """后台任务：按窗口收集请求并批量嵌入"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                vectors = await loop.run_in_executor(None, self.embed_fn, [text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+
+def _quantize_vector(vector: List[float]) -> bytes:
+    """float向量按最大绝对值对称量化为int8，末尾附加float32缩放系数（D+4字节）"""
+    vec = np.asarray(vector, dtype=np.float32)
+    scale = float(np.abs(vec).max()) / 127 or 1.0
+    return np.round(vec / scale).astype(np.int8).tobytes() + struct.pack("<f", scale)
+
+
+def _dequantize_vector(blob: bytes) -> List[float]:
+    """_quantize_vector的逆操作"""
+    scale = struct.unpack("<f", blob[-4:])[0]
+    return (np.frombuffer(blob[:-4], dtype=np.int8).astype(np.float32) * scale).tolist()
+
+
+class QueryEmbeddingCache:
+    """
+    查询向量两级缓存
+
+    第一级为进程内LRU（原始精度），第二级为Redis中int8量化后的字节（约为float32的1/4），
+    键中包含模型名称，切换嵌入模型后旧向量不会被误用
+    """
+    
+    def __init__(self, model: str, maxsize: int = _QUERY_EMBEDDING_CACHE_SIZE,
+                 ttl_ms: int = _QUERY_EMBEDDING_TTL_MS):
+        """
+        Args:
+            model: 嵌入模型名称
+            maxsize: 进程内缓存条目上限
+            ttl_ms: Redis缓存过期时间（毫秒）
+        """
+        self.model = model
+        self.maxsize = maxsize
+        self.ttl_ms = ttl_ms
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _redis_key(self, text: str) -> str:
+        """Redis缓存键"""
+        return f"emb:q8:{self.model}:{hashlib.sha256(text.encode()).hexdigest()}"
+    
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """批量查找缓存，未命中的位置为None"""
+        vectors = [None] * len(texts)
+        missing = []
+        with self._lock:
+            for i, text in enumerate(texts):
+                vector = self._local.get(text)
+                if vector is None:
+                    missing.append(i)
+                else:
+                    self._local.move_to_end(text)
+                    vectors[i] = vector
+        
+        if missing and redis_manager:
+            blobs = redis_manager.mget_bytes([self._redis_key(texts[i]) for i in missing])
+            found = {}
+            for i, blob in zip(missing, blobs):
+                if blob:
+                    vectors[i] = _dequantize_vector(blob)
+                    found[texts[i]] = vectors[i]
+            self._remember(found)
+        
+        return vectors
+    
+    def put_many(self, mapping: Dict[str, List[float]]):
+        """写入两级缓存"""
+        if not mapping:
+            return
+        self._remember(mapping)
+        if redis_manager:
+            redis_manager.set_many_bytes(
+                {
+                    self._redis_key(text): _quantize_vector(vector)
+                    for text, vector in mapping.items()
+                },
+                px=self.ttl_ms
+            )
+    
+    def _remember(self, mapping: Dict[str, List[float]]):
+        """写入进程内LRU，超出容量时淘汰最久未用的条目"""
+        with self._lock:
+            for text, vector in mapping.items():
+                self._local[text] = vector
+                self._local.move_to_end(text)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+
 class RAGPipeline:
     """RAG管道类 - 检索增强生成"""
     
@@ -55,6 +286,11 @@ class RAGPipeline:
         self.embeddings = None
         self._initialized = False
         self._init_error = None
+        self._retrieval_semaphore = asyncio.Semaphore(_MAX_CONCURRENT_RETRIEVALS)
+        self._embedding_batcher = None
+        self._query_embedding_cache = None
+        self._doc_count = (0.0, None)
+        _PIPELINES.add(self)
         
         # 初始化组件
         self._initialize_components()
@@ -68,16 +304,17 @@ class RAGPipeline:
                       os.getenv("OPENAI_API_KEY"))
             
             if api_key:
-                self.embeddings = DashScopeEmbeddings(
-                    model="text-embedding-v2",
-                    dashscope_api_key=api_key
-                )
+                # 嵌入请求走共享连接池，复用TLS连接
+                self.embeddings = create_dashscope_embeddings(api_key, model="text-embedding-v2")
                 logger.info("使用DashScopeEmbeddings嵌入模型")
                 logger.info(f"API密钥长度: {len(api_key)}")
             else:
                 logger.warning("未找到API密钥（DASHSCOPE_API_KEY/BAILIAN_API_KEY），使用模拟嵌入")
                 self.embeddings = MockEmbeddings()
             
+            self._query_embedding_cache = QueryEmbeddingCache(getattr(self.embeddings, "model", None) or "mock")
+            self._embedding_batcher = EmbeddingBatcher(self._embed_queries)
+            
             # 2. 加载向量数据库 - 使用Qdrant
             try:
                 from app.services.knowledge_base import QdrantVectorStore
@@ -85,6 +322,8 @@ class RAGPipeline:
                 self.vectorstore = QdrantVectorStore(
                     collection_name=self.collection_name
                 )
+                # 同步检索与微批检索共用同一个嵌入客户端，不再各自创建
+                self.vectorstore._embeddings = self.embeddings
                 logger.info(f"成功加载Qdrant向量数据库: {self.collection_name}")
                 
             except ImportError as e:
@@ -148,43 +387,154 @@ class RAGPipeline:
         """
         try:
             logger.info(f"开始检索文档，查询: {query}, top_k: {top_k}")
-            logger.info(f"RAG管道状态: {self.is_available()}")
             
             if not self.vectorstore:
                 logger.error("向量数据库未初始化，无法检索文档")
                 return []
             
-            docs = self.vectorstore.search_knowledge(query, limit=top_k)
+            cache_key = self._retrieval_cache_key(query, top_k)
+            version, cached = self._get_cached_retrieval(cache_key)
+            if cached is not None:
+                logger.info(f"命中检索缓存，返回 {len(cached)} 个文档")
+                return cached
+            
+            # 重复查询的向量直接取自缓存，省去一次嵌入请求
+            query_vector = self._embed_queries([query])[0]
+            docs = self.vectorstore.search_by_vector(query_vector, top_k)
             logger.info(f"知识库搜索返回 {len(docs)} 个文档")
             
-            results = []
-            for i, doc in enumerate(docs):
-                result = {
-                    "content": doc['content'],
-                    "metadata": {
-                        "source": doc['source'],
-                        "section": doc.get('section', '')
-                    },
-                    "score": doc['score']
-                }
-                results.append(result)
-                logger.info(f"文档 {i+1}: 相似度分数={result['score']}, 源文件={result['metadata'].get('source', '未知')}")
-                logger.debug(f"文档 {i+1} 内容预览: {result['content'][:100]}...")
-            
-            logger.info(f"成功检索到 {len(results)} 个相关文档")
+            results = self._format_results(docs)
+            if results:
+                self._cache_retrieval(cache_key, version, results)
             return results
             
         except Exception as e:
             logger.error(f"文档检索失败: {e}", exc_info=True)
             return []
     
-    def generate_response(self, query: str, retrieved_docs: List[Dict]) -> str:
+    def _format_results(self, docs: List[Dict]) -> List[Dict]:
+        """将向量库搜索结果转换为检索结果格式"""
+        results = [
+            {
+                "content": doc['content'],
+                "metadata": {
+                    "source": doc['source'],
+                    "section": doc.get('section', '')
+                },
+                "score": doc['score']
+            }
+            for doc in docs
+        ]
+        
+        # 逐文档明细只在DEBUG级别格式化
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, result in enumerate(results, 1):
+                logger.debug(f"文档 {i}: 相似度分数={result['score']}, 源文件={result['metadata']['source'] or '未知'}")
+                logger.debug(f"文档 {i} 内容预览: {result['content'][:100]}...")
+        
+        logger.info(f"成功检索到 {len(results)} 个相关文档")
+        return results
+    
+    def _embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """批量生成查询向量；先查两级缓存，未命中的文本用query类型一次批量请求DashScope"""
+        vectors = self._query_embedding_cache.get_many(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if not missing:
+            return vectors
+        
+        if isinstance(self.embeddings, DashScopeEmbeddings):
+            resp = embed_with_retry(
+                self.embeddings, input=missing, text_type="query", model=self.embeddings.model
+            )
+            computed = dict(zip(missing, (item["embedding"] for item in resp)))
+        else:
+            computed = {text: self.embeddings.embed_query(text) for text in missing}
+        self._query_embedding_cache.put_many(computed)
+        
+        return [vector if vector is not None else computed[text] for text, vector in zip(texts, vectors)]
+    
+    def _retrieval_cache_key(self, query: str, top_k: int) -> str:
+        """检索结果缓存键"""
+        return f"rag:{self.collection_name}:{top_k}:{CommonTool.cache_key(query)}"
+    
+    def _get_cached_retrieval(self, cache_key: str):
+        """
+        一次MGET同时读取集合版本号和缓存的检索结果
+        
+        Returns:
+            (当前版本号, 版本一致时的缓存结果或None)
+        """
+        if not redis_manager:
+            return None, None
+        
+        version, data = redis_manager.mget([retrieval_version_key(self.collection_name), cache_key])
+        if data:
+            try:
+                cached = json_loads(data)
+                if cached.get("version") == version:
+                    return version, cached["documents"]
+            except Exception as e:
+                logger.warning(f"解析检索缓存失败: {e}")
+        return version, None
+    
+    def _cache_retrieval(self, cache_key: str, version: Optional[str], results: List[Dict]):
+        """写入检索结果缓存，附带当前集合版本号"""
+        if not redis_manager:
+            return
+        
+        redis_manager.setex(
+            cache_key,
+            _RETRIEVAL_CACHE_TTL,
+            json_dumps({"version": version, "documents": results})
+        )
+    
+    async def aretrieve_documents(self, query: str, top_k: int = 5) -> List[Dict]:
+        """
+        异步检索相关文档：查询向量经微批合并生成，向量搜索在线程池中执行，不阻塞事件循环
+        
+        Args:
+            query: 用户查询
+            top_k: 返回文档数量
+            
+        Returns:
+            检索到的文档列表
+        """
+        if not self.vectorstore or self._embedding_batcher is None:
+            async with self._retrieval_semaphore:
+                return await asyncio.to_thread(self.retrieve_documents, query, top_k)
+        
+        async with self._retrieval_semaphore:
+            try:
+                logger.info(f"开始检索文档，查询: {query}, top_k: {top_k}")
+                
+                cache_key = self._retrieval_cache_key(query, top_k)
+                version, cached = await asyncio.to_thread(self._get_cached_retrieval, cache_key)
+                if cached is not None:
+                    logger.info(f"命中检索缓存，返回 {len(cached)} 个文档")
+                    return cached
+                
+                # 并发请求的查询向量合并为批量嵌入
+                query_vector = await self._embedding_batcher.embed(query)
+                docs = await asyncio.to_thread(self.vectorstore.search_by_vector, query_vector, top_k)
+                logger.info(f"知识库搜索返回 {len(docs)} 个文档")
+                
+                results = self._format_results(docs)
+                if results:
+                    await asyncio.to_thread(self._cache_retrieval, cache_key, version, results)
+                return results
+                
+            except Exception as e:
+                logger.error(f"文档检索失败: {e}", exc_info=True)
+                return []
+    
+    def generate_response(self, query: str, retrieved_docs: List[Dict], context: Optional[str] = None) -> str:
         """
         基于检索的文档生成回答
         
         Args:
             query: 用户查询
             retrieved_docs: 检索到的文档
+            context: 已构建好的上下文（如process_message返回的context），为空时由文档构建
             
         Returns:
             生成的回答
@@ -194,22 +544,14 @@ class RAGPipeline:
         
         try:
             # 构建上下文
-            context = self._build_context(retrieved_docs)
+            if context is None:
+                context = self._build_context(retrieved_docs)
             
             # 构建提示词
             prompt = self._build_prompt(query, context)
             
-            # 调用LLM生成回答
-            if isinstance(self.llm, MockLLM):
-                # 模拟LLM回答
-                response = self.llm.generate(prompt, retrieved_docs)
-            else:
-                # 真实LLM调用
-                messages = [HumanMessage(content=prompt)]
-                response = self.llm.invoke(messages)
-                response = response.content
-            
-            return response
+            # 调用LLM生成回答（真实LLM与MockLLM接口一致）
+            return self.llm.invoke([HumanMessage(content=prompt)]).content
             
         except Exception as e:
             logger.error(f"生成回答失败: {e}")
@@ -218,10 +560,10 @@ class RAGPipeline:
     def _build_context(self, docs: List[Dict]) -> str:
         """构建检索文档的上下文"""
         context_parts = []
+        contents = _truncate_contents([doc["content"] for doc in docs])
         
-        for i, doc in enumerate(docs, 1):
+        for i, (doc, content) in enumerate(zip(docs, contents), 1):
             source = doc.get("metadata", {}).get("source", f"文档{i}")
-            content = doc["content"]
             context_parts.append(f"=== {source} ===\n{content}")
         
         return "\n\n".join(context_parts)
@@ -245,57 +587,32 @@ class RAGPipeline:
             return "未在知识库中找到与您问题相关的信息。\n\n💡 建议：\n• 请尝试重新描述您的问题\n• 如果涉及具体订单或物流，请提供订单号或快递单号\n• 您也可以直接联系客服热线：400-123-4567 获取人工帮助"
         
         try:
-            # 构建文档上下文
-            context = self._build_context(retrieved_docs)
-            
-            # 构建提示词
-            if conversation_context and context_prompt:
-                # 有会话上下文的情况
-                prompt = f"""{context_prompt}
-
-                基于以下相关政策文档回答：
-                {context}
-
-                请提供准确、专业的回答，并引用具体的政策条款。"""
-            else:
-                # 没有会话上下文的情况
-                prompt = self._build_prompt(query, context)
-            
-            # 调用LLM生成回答
-            if isinstance(self.llm, MockLLM):
-                # 模拟LLM回答
-                response = self.llm.generate(prompt, retrieved_docs)
-            else:
-                # 真实LLM调用
-                messages = [HumanMessage(content=prompt)]
-                response = self.llm.invoke(messages)
-                response = response.content
+            prompt = self._build_context_aware_prompt(query, retrieved_docs, context_prompt, conversation_context)
             
-            return response
+            # 调用LLM生成回答（真实LLM与MockLLM接口一致）
+            return self.llm.invoke([HumanMessage(content=prompt)]).content
             
         except Exception as e:
             logger.error(f"生成上下文回答失败: {e}")
             return f"处理您的问题时出现错误: {e}"
     
+    def _build_context_aware_prompt(self, query: str, retrieved_docs: List[Dict],
+                                    context_prompt: str = "",
+                                    conversation_context: List[Dict] = None) -> str:
+        """构建带会话上下文的提示词，无会话上下文时使用默认模板"""
+        # 构建文档上下文
+        context = self._build_context(retrieved_docs)
+        
+        if conversation_context and context_prompt:
+            # 有会话上下文的情况
+            return _CONTEXT_PROMPT_TEMPLATE.format_map({"context_prompt": context_prompt, "context": context})
+        
+        # 没有会话上下文的情况
+        return self._build_prompt(query, context)
+    
     def _build_prompt(self, query: str, context: str) -> str:
         """构建提示词"""
-        prompt = f"""你是客服助手，请根据以下政策文档回答用户问题。
-
-用户问题：{query}
-
-相关政策文档：
-{context}
-
-请遵循以下严格要求：
-1. 只能基于提供的文档内容回答问题
-2. 如果文档中没有相关信息，必须明确告知用户"未在知识库中找到相关内容"
-3. 严格禁止编造、推测或虚构任何不在文档中的信息
-4. 回答要专业、友好
-5. 引用具体的政策条款（如果有）
-6. 如果涉及具体操作指引，请详细说明（基于文档内容）
-
-回答："""
-        return prompt
+        return _PROMPT_TEMPLATE.format_map({"query": query, "context": context})
     
     async def process_message(self, message: str, session_id: str = None, 
                             conversation_context: List[Dict] = None) -> Dict[str, Any]:
@@ -315,35 +632,44 @@ class RAGPipeline:
         
         try:
             # 1. 检索相关文档
-            retrieved_docs = self.retrieve_documents(message, top_k=5)
-            
-            # 在控制台输出检索到的信息，方便调试
-            print("\n=== 向量知识库检索结果 ===")
-            print(f"查询: {message}")
-            print(f"检索到文档数量: {len(retrieved_docs)}")
-            
-            for i, doc in enumerate(retrieved_docs, 1):
-                print(f"\n文档 {i}:")
-                print(f"相似度分数: {doc.get('score', '未知')}")
-                print(f"源文件: {doc.get('metadata', {}).get('source', '未知')}")
-                print(f"内容: {doc['content'][:200]}{'...' if len(doc['content']) > 200 else ''}")
-            
-            print("==========================\n")
-            
-            # 2. 构建引用信息
+            retrieved_docs = await self.aretrieve_documents(message, top_k=5)
+            
+            # 2. 单次遍历同时构建调试输出、引用信息和LLM上下文
+            debug_lines = [
+                "\n=== 向量知识库检索结果 ===",
+                f"查询: {message}",
+                f"检索到文档数量: {len(retrieved_docs)}"
+            ]
             references = []
-            for doc in retrieved_docs:
-                source = doc.get("metadata", {}).get("source", "未知来源")
+            context_parts = []
+            contents = _truncate_contents([doc["content"] for doc in retrieved_docs])
+            for i, (doc, context_content) in enumerate(zip(retrieved_docs, contents), 1):
+                content = doc["content"]
+                source = doc.get("metadata", {}).get("source")
+                score = doc.get("score")
+                
+                debug_lines.append(
+                    f"\n文档 {i}:\n"
+                    f"相似度分数: {score if score is not None else '未知'}\n"
+                    f"源文件: {source or '未知'}\n"
+                    f"内容: {content[:200]}{'...' if len(content) > 200 else ''}"
+                )
                 references.append({
-                    "source": source,
-                    "content_preview": doc["content"][:100] + "..." if len(doc["content"]) > 100 else doc["content"],
-                    "score": doc.get("score", None)
+                    "source": source or "未知来源",
+                    "content_preview": content[:100] + "..." if len(content) > 100 else content,
+                    "score": score
                 })
+                context_parts.append(f"=== {source or f'文档{i}'} ===\n{context_content}")
+            
+            debug_lines.append("==========================\n")
+            # 在控制台输出检索到的信息，方便调试
+            print("\n".join(debug_lines))
             
             # 3. 返回结果
             result = {
                 "documents": retrieved_docs,  # 返回原始检索文档
                 "references": references,     # 简化的引用信息
+                "context": "\n\n".join(context_parts),  # 可直接传给generate_response的上下文
                 "query": message,
                 "session_id": session_id,
                 "has_knowledge": len(retrieved_docs) > 0,
@@ -364,20 +690,52 @@ class RAGPipeline:
                 "error": str(e)
             }
     
+    async def warm_up(self, query: str = "健康检查"):
+        """
+        预热检索链路：建立嵌入与Qdrant连接、加载索引，避免首个用户请求承担冷启动开销
+        
+        直接按向量搜索，不写入检索结果缓存
+        """
+        if not self.vectorstore or self._embedding_batcher is None:
+            return
+        
+        try:
+            start_time = time.time()
+            query_vector = await self._embedding_batcher.embed(query)
+            await asyncio.to_thread(self.vectorstore.search_by_vector, query_vector, 1)
+            logger.info(f"RAG管道预热完成，耗时 {time.time() - start_time:.3f}s")
+        except Exception as e:
+            logger.warning(f"RAG管道预热失败: {e}")
+    
+    def invalidate_stats(self):
+        """使文档数缓存失效（知识库更新后由bump_retrieval_version调用）"""
+        self._doc_count = (0.0, None)
+    
+    def _document_count(self) -> int:
+        """集合中的文档片段数，缓存_DOC_COUNT_TTL秒，过期或invalidate_stats后才重新查询"""
+        now = time.monotonic()
+        cached_at, count = self._doc_count
+        if count is not None and now - cached_at < _DOC_COUNT_TTL:
+            return count
+        
+        # 直接按集合名计数（近似计数即可），不再列出全部集合逐个比对
+        count = self.vectorstore.client.count(self.collection_name, exact=False).count
+        self._doc_count = (now, count)
+        return count
+    
     def get_knowledge_stats(self) -> Dict[str, Any]:
         """获取知识库统计信息"""
         try:
-            from app.services.knowledge_base import QdrantVectorStore
-            
-            qdrant_store = QdrantVectorStore(collection_name=self.collection_name)
-            collections = qdrant_store.client.get_collections()
-            collection_info = next((c for c in collections.collections if c.name == self.collection_name), None)
+            # 复用初始化时建立的连接，不再为统计单独创建客户端
+            qdrant_store = self.vectorstore
+            if qdrant_store is None:
+                raise RuntimeError("向量数据库未初始化")
             
-            count = collection_info.points_count if collection_info else 0
+            count = self._document_count()
             
             embedding_info = "DashScopeEmbeddings" if isinstance(self.embeddings, DashScopeEmbeddings) else "MockEmbeddings"
             
-            return {
+            stats = {
                 "total_documents": count,
                 "collection_name": self.collection_name,
                 "vectorstore_type": "Qdrant",
@@ -386,6 +744,7 @@ class RAGPipeline:
                 "embedding_model": embedding_info,
                 "is_vectorstore_loaded": self.vectorstore is not None
             }
+            return stats
         except Exception as e:
             logger.error(f"获取统计信息失败: {e}")
             return {
@@ -405,8 +764,10 @@ class RAGPipeline:
             相关文档列表
         """
         try:
-            # 使用向量数据库进行知识库搜索
-            results = self.vectorstore.search_knowledge(query, limit=top_k)
+            # 查询向量经微批合并生成（同样走两级缓存），向量搜索在线程池中执行，不阻塞事件循环
+            async with self._retrieval_semaphore:
+                query_vector = await self._embedding_batcher.embed(query)
+                results = await asyncio.to_thread(self.vectorstore.search_by_vector, query_vector, top_k)
             logger.info(f"异步检索到 {len(results)} 个相关文档")
             
             # 将搜索结果转换为Document对象以保持与LangChain接口兼容
@@ -432,15 +793,11 @@ class RAGPipeline:
 class MockLLM:
     """模拟LLM类 - 用于演示"""
     
-    def generate(self, prompt: str, retrieved_docs: List[Dict]) -> str:
-        """模拟生成回答"""
+    def generate(self, prompt: str) -> str:
+        """模拟生成回答（只返回文本，引用来源由process_message从检索文档中给出）"""
         # 简单的规则生成回答
         if "退货" in prompt or "退换货" in prompt:
-            if retrieved_docs:
-                source = retrieved_docs[0].get("metadata", {}).get("source", "政策文档")
-                return f"根据{source}，商品收到后7天内可申请退换货。商品必须保持原包装完整，未经使用。具体流程：\n1. 联系客服提出退换货申请\n2. 提供订单号和退换货原因\n3. 客服审核通过后提供退货地址\n4. 客户寄回商品并提供快递单号\n5. 仓库收到商品后3个工作日内处理"
-            else:
-                return "关于退换货政策，建议您联系我们的客服获得详细信息。"
+            return "根据政策文档，商品收到后7天内可申请退换货。商品必须保持原包装完整，未经使用。具体流程：\n1. 联系客服提出退换货申请\n2. 提供订单号和退换货原因\n3. 客服审核通过后提供退货地址\n4. 客户寄回商品并提供快递单号\n5. 仓库收到商品后3个工作日内处理"
         
         elif "客服时间" in prompt or "工作时间" in prompt:
             return "我们的客服时间为：工作日9:00-18:00。紧急情况有24小时响应机制，节假日期间也提供值班服务。"
@@ -452,41 +809,18 @@ class MockLLM:
             return "感谢您的咨询。建议您提供更具体的问题，我将根据政策文档为您提供准确的信息。"
     
     def invoke(self, messages):
-        """模拟LLM调用"""
-        class MockResponse:
-            def __init__(self, content):
-                self.content = content
-        
-        prompt = messages[0].content
-        response = self.generate(prompt, [])
-        return MockResponse(response)
+        """模拟LLM调用，返回与真实LLM相同的带content属性的响应"""
+        return MockResponse(self.generate(messages[0].content))
 
 
-class MockEmbeddings:
-    """模拟嵌入类 - 生成1536维向量以匹配text-embedding-v2"""
-    
-    def embed_query(self, text):
-        import hashlib
-        import math
-        
-        # 生成1536维的向量
-        hash_val = hashlib.md5(text.encode()).digest()
-        vector = []
-        
-        # 使用哈希值生成1536维的向量
-        for i in range(1536):
-            byte_val = hash_val[i % len(hash_val)]
-            # 生成-1到1之间的值
-            value = (byte_val / 255.0) * 2 - 1
-            vector.append(value)
-        
-        return vector
+class MockResponse:
+    """模拟LLM响应"""
     
-    def embed_documents(self, texts):
-        return [self.embed_query(text) for text in texts]
+    def __init__(self, content):
+        self.content = content
 
 
-def main():
+async def main():
     """主函数 - 测试RAG管道"""
     # 创建RAG管道实例
     rag = RAGPipeline()
@@ -504,14 +838,15 @@ def main():
     ]
     
     print("\n=== RAG管道测试 ===")
-    for message in test_messages:
+    # 各条消息的检索相互独立，并发执行
+    results = await asyncio.gather(*(rag.process_message(message) for message in test_messages))
+    for message, result in zip(test_messages, results):
         print(f"\n用户: {message}")
-        result = rag.process_message(message)
-        print(f"AI: {result['response']}")
+        print(f"检索到: {result.get('retrieved_count', 0)} 个文档")
         print(f"引用: {len(result['references'])} 个文档")
         for ref in result['references']:
             print(f"  - {ref['source']}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
@@ -6,8 +6,63 @@ Qdrant 向量数据库可视化工具
 
 import streamlit as st
 import json
+from collections import Counter
 from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchValue
+from qdrant_client.models import Filter, FieldCondition, MatchValue, PayloadSelectorExclude
+
+# 统计时每次scroll拉取的点数
+STATS_PAGE_SIZE = 256
+# 统计结果缓存时间（秒），切换标签页时不重复查询
+STATS_CACHE_TTL = 60
+# 统计时不传输的大字段（文档正文）
+LARGE_PAYLOAD_FIELDS = ["page_content"]
+
+
+@st.cache_resource
+def get_client(qdrant_url):
+    """每个Qdrant地址只创建一个客户端，页面重跑时复用"""
+    return QdrantClient(url=qdrant_url)
+
+
+def iter_points(client, collection_name, page_size=STATS_PAGE_SIZE, **scroll_kwargs):
+    """按next_offset分页遍历集合中的全部点，每次只请求一页"""
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_vectors=False,
+            **scroll_kwargs
+        )
+        yield from points
+        if offset is None:
+            break
+
+
+@st.cache_data(ttl=STATS_CACHE_TTL, show_spinner="正在统计...")
+def payload_stats(qdrant_url, collection_name):
+    """
+    统计集合的payload字段频率和源文件分布
+    
+    只传输除正文外的payload字段，结果缓存STATS_CACHE_TTL秒
+    
+    Returns:
+        (字段频率, 源文件分布)，均按次数降序
+    """
+    field_stats = Counter()
+    sources = Counter()
+    points = iter_points(
+        get_client(qdrant_url),
+        collection_name,
+        with_payload=PayloadSelectorExclude(exclude=LARGE_PAYLOAD_FIELDS)
+    )
+    for point in points:
+        payload = point.payload or {}
+        field_stats.update(payload.keys())
+        sources[payload.get('source', 'Unknown')] += 1
+    return field_stats.most_common(), sources.most_common()
+
 
 # 页面配置
 st.set_page_config(
@@ -34,7 +89,7 @@ with st.sidebar:
     
     # 连接状态
     try:
-        client = QdrantClient(url=qdrant_url)
+        client = get_client(qdrant_url)
         collections = client.get_collections()
         st.success("✅ 已连接到 Qdrant")
         
@@ -137,38 +192,16 @@ if selected_collection:
         with tab3:
             st.subheader("Payload 字段统计")
             
-            # 获取所有点的payload
-            all_points, _ = client.scroll(
-                collection_name=selected_collection,
-                limit=100,
-                with_payload=True,
-                with_vectors=False
-            )
-            
-            # 统计字段
-            field_stats = {}
-            for point in all_points:
-                if point.payload:
-                    for key in point.payload.keys():
-                        if key not in field_stats:
-                            field_stats[key] = 0
-                        field_stats[key] += 1
+            field_stats, sources = payload_stats(qdrant_url, selected_collection)
             
             # 显示统计
             st.write("字段出现频率:")
-            for field, count in sorted(field_stats.items(), key=lambda x: -x[1]):
+            st.caption(f"正文字段 {', '.join(LARGE_PAYLOAD_FIELDS)} 不参与统计传输")
+            for field, count in field_stats:
                 st.write(f"  - {field}: {count} 次")
             
-            # 源文件统计
-            sources = {}
-            for point in all_points:
-                source = point.payload.get('source', 'Unknown')
-                if source not in sources:
-                    sources[source] = 0
-                sources[source] += 1
-            
             st.write("\n源文件统计:")
-            for source, count in sorted(sources.items(), key=lambda x: -x[1]):
+            for source, count in sources:
                 st.write(f"  - {source}: {count} 条")
         
     except Exception as e:
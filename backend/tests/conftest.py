@@ -0,0 +1,7 @@
+"""
+测试配置：将 backend 目录加入导入路径，使 `app` 包可直接导入
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
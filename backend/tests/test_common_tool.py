@@ -0,0 +1,37 @@
+"""
+CommonTool 订单号/手机号提取测试
+"""
+import pytest
+
+from app.services.tools.common_tool import CommonTool
+
+
+@pytest.fixture
+def tool():
+    return CommonTool()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("订单号：ABC12345", "ABC12345"),
+    ("我的订单 20240101888 还没发货", "20240101888"),
+    # 带前缀的订单号优先于前面出现的通用匹配
+    ("MyOrder: ABC12345", "ABC12345"),
+    ("no123456 订单号QWE12345", "QWE12345"),
+    ("请帮我查一下 XYZ98765", "XYZ98765"),
+    ("你好", None),
+    ("", None),
+])
+def test_extract_order_id(tool, text, expected):
+    assert tool.extract_order_id_from_text(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("手机号：13812345678", "13812345678"),
+    # 手机号标签优先于前面出现的电话标签
+    ("电话:13812345678 手机号:13999999999", "13999999999"),
+    ("联系电话：15900001111", "15900001111"),
+    ("电话:12345678901", None),
+    ("没有号码", None),
+])
+def test_extract_phone(tool, text, expected):
+    assert tool.extract_phone_from_text(text) == expected
@@ -0,0 +1,132 @@
+"""
+AgentCoordinator 并发相同问题合并（single-flight）测试
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_openai")
+
+from app.models import AgentResponse, IntentType
+from app.services.agents.coordinator import AgentCoordinator, _match_hot_keywords
+
+
+class RecordingLogger:
+    """记录交互日志的LoggerTool替身"""
+
+    def __init__(self):
+        self.interactions = []
+
+    def log_system_event(self, *args, **kwargs):
+        pass
+
+    def log_agent_action(self, *args, **kwargs):
+        pass
+
+    def log_user_interaction(self, user_id, session_id, user_input, agent_response, metadata=None):
+        self.interactions.append(session_id)
+
+
+class FakeRouter:
+    def __init__(self):
+        self.calls = 0
+
+    async def route(self, user_input):
+        self.calls += 1
+        return AgentResponse(
+            success=True,
+            content="",
+            intent=IntentType.PRESALES,
+            context={"processing_time": 0.01, "extracted_info": {}}
+        )
+
+
+class FakeProductAgent:
+    """在release前阻塞，保证并发请求在处理期间到达"""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.error = error
+
+    async def query_product(self, user_input, session_id=None):
+        self.calls += 1
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return AgentResponse(
+            success=True,
+            content="商品收到后7天内可申请退换货。",
+            intent=IntentType.PRESALES,
+            sources=[{"source": "policy.pdf"}],
+            context={"processing_time": 0.2, "session_id": session_id}
+        )
+
+
+@pytest.fixture
+def coordinator():
+    coordinator = AgentCoordinator(logger_tool=RecordingLogger())
+    coordinator.intent_router = FakeRouter()
+    coordinator.product_agent = FakeProductAgent()
+    return coordinator
+
+
+async def _ask_concurrently(coordinator, sessions, question="这款商品有什么颜色"):
+    tasks = [
+        asyncio.create_task(coordinator.process_message(question, session_id=session))
+        for session in sessions
+    ]
+    # 让所有请求都进入等待状态后再放行首个请求
+    await asyncio.sleep(0)
+    coordinator.product_agent.release.set()
+    return await asyncio.gather(*tasks)
+
+
+def test_concurrent_identical_questions_share_one_agent_call(coordinator):
+    first, second = asyncio.run(_ask_concurrently(coordinator, ["session-a", "session-b"]))
+
+    assert coordinator.intent_router.calls == 1
+    assert coordinator.product_agent.calls == 1
+    assert first.content == second.content
+
+
+def test_each_caller_gets_its_own_session_context(coordinator):
+    first, second = asyncio.run(_ask_concurrently(coordinator, ["session-a", "session-b"]))
+
+    assert first.context["session_id"] == "session-a"
+    assert second.context["session_id"] == "session-b"
+    assert first is not second
+    assert first.sources is not second.sources
+
+
+def test_each_caller_is_logged_and_counted(coordinator):
+    asyncio.run(_ask_concurrently(coordinator, ["session-a", "session-b"]))
+
+    assert sorted(coordinator.logger_tool.interactions) == ["session-a", "session-b"]
+    assert coordinator.agent_stats["intent_router"]["calls"] == 2
+    assert coordinator.agent_stats["product_agent"]["calls"] == 2
+
+
+def test_failure_is_reported_to_every_waiting_caller(coordinator):
+    coordinator.product_agent = FakeProductAgent(error=RuntimeError("LLM不可用"))
+
+    first, second = asyncio.run(_ask_concurrently(coordinator, ["session-a", "session-b"]))
+
+    assert coordinator.product_agent.calls == 1
+    assert not first.success and not second.success
+    assert first.context["error"] == second.context["error"] == "LLM不可用"
+
+
+def test_later_question_runs_again_after_completion(coordinator):
+    asyncio.run(_ask_concurrently(coordinator, ["session-a"]))
+    asyncio.run(_ask_concurrently(coordinator, ["session-b"]))
+
+    assert coordinator.product_agent.calls == 2
+    assert coordinator._inflight == {}
+
+
+def test_match_hot_keywords_finds_keywords_in_question():
+    matched = _match_hot_keywords("退货流程是怎样的")
+
+    assert {"退货", "流程", "怎样"} <= set(matched)
+    assert _match_hot_keywords("今天天气不错") == []
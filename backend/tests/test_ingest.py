@@ -0,0 +1,79 @@
+"""
+文档摄取去重测试：相同内容的片段只写入一次，所有来源保留在sources中
+"""
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("dotenv")
+
+from app.utils.ingest import DocumentIngestor
+
+
+class FakeQdrantVectorStore:
+    """记录写入的点和payload更新，代替真实的Qdrant"""
+
+    instances = []
+
+    def __init__(self, collection_name):
+        self.collection_name = collection_name
+        self.connected = True
+        self.connect_error = None
+        self.points = {}
+        FakeQdrantVectorStore.instances.append(self)
+
+    def add_texts_batch(self, texts, metadatas, embeddings, batch_size=64, ids=None):
+        embeddings.embed_documents(texts)
+        for point_id, text, metadata in zip(ids, texts, metadatas):
+            self.points[point_id] = {"page_content": text, **metadata}
+        return len(texts)
+
+    def set_chunk_payload(self, point_id, payload):
+        self.points[point_id].update(payload)
+        return True
+
+
+@pytest.fixture
+def ingestor(tmp_path, monkeypatch):
+    monkeypatch.delenv("BAILIAN_API_KEY", raising=False)
+    fake_module = types.ModuleType("app.services.knowledge_base")
+    fake_module.QdrantVectorStore = FakeQdrantVectorStore
+    monkeypatch.setitem(sys.modules, "app.services.knowledge_base", fake_module)
+    FakeQdrantVectorStore.instances.clear()
+    return DocumentIngestor(knowledge_dir=str(tmp_path), collection_name="test_docs")
+
+
+def test_shared_chunk_across_batches_keeps_every_source(ingestor, tmp_path):
+    shared = "本政策最终解释权归公司所有。"
+    (tmp_path / "a.txt").write_text(shared, encoding="utf-8")
+    (tmp_path / "b.txt").write_text(shared, encoding="utf-8")
+    (tmp_path / "c.txt").write_text("退货需在收货后7天内申请。", encoding="utf-8")
+
+    # 每批只有一个片段，两个文件的相同片段必然落在不同批次
+    assert ingestor.ingest_all(batch_size=1) is not None
+
+    store = FakeQdrantVectorStore.instances[-1]
+    assert len(store.points) == 2
+
+    shared_points = [p for p in store.points.values() if p["page_content"] == shared]
+    assert len(shared_points) == 1
+    assert sorted(meta["source"] for meta in shared_points[0]["sources"]) == ["a.txt", "b.txt"]
+
+
+def test_duplicates_within_one_batch_are_merged(ingestor):
+    from langchain_core.documents import Document
+
+    store = FakeQdrantVectorStore("test_docs")
+    docs = [
+        Document(page_content="相同内容", metadata={"source": "a.txt"}),
+        Document(page_content="相同内容", metadata={"source": "b.txt"}),
+        Document(page_content="不同内容", metadata={"source": "a.txt"}),
+    ]
+
+    written = ingestor._write_batch(store, docs, ingestor.create_embeddings(), batch_size=8)
+
+    assert written == 2
+    merged = next(p for p in store.points.values() if p["page_content"] == "相同内容")
+    assert [meta["source"] for meta in merged["sources"]] == ["a.txt", "b.txt"]
@@ -0,0 +1,44 @@
+"""
+LLM配置缓存测试：相同配置复用同一实例，不可哈希的参数也能作为缓存键
+"""
+import pytest
+
+pytest.importorskip("langchain_openai")
+
+from app.services import llm_config
+
+
+class FakeChatOpenAI:
+    """记录构造参数的ChatOpenAI替身"""
+
+    created = 0
+
+    def __init__(self, **kwargs):
+        FakeChatOpenAI.created += 1
+        self.kwargs = kwargs
+
+
+@pytest.fixture(autouse=True)
+def fake_llm(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://localhost:8000/v1")
+    monkeypatch.setattr(llm_config, "ChatOpenAI", FakeChatOpenAI)
+    monkeypatch.setattr(llm_config, "_custom_llm_instances", {})
+    FakeChatOpenAI.created = 0
+
+
+def test_unhashable_kwargs_are_cached():
+    first = llm_config.create_llm_with_custom_config(stop=["\n"], model_kwargs={"top_p": 0.9})
+    second = llm_config.create_llm_with_custom_config(model_kwargs={"top_p": 0.9}, stop=["\n"])
+
+    assert first is second
+    assert FakeChatOpenAI.created == 1
+    assert first.kwargs["stop"] == ["\n"]
+
+
+def test_different_kwargs_get_separate_instances():
+    first = llm_config.create_llm_with_custom_config(stop=["\n"])
+    second = llm_config.create_llm_with_custom_config(stop=["。"])
+
+    assert first is not second
+    assert FakeChatOpenAI.created == 2
@@ -0,0 +1,60 @@
+"""
+RAG管道测试：模拟嵌入可直接使用，知识库更新后检索缓存失效
+"""
+import time
+
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("langchain.messages")
+pytest.importorskip("dotenv")
+
+from app.utils import rag_pipeline
+
+
+def test_mock_embed_query_returns_deterministic_vector():
+    embeddings = rag_pipeline.MockEmbeddings()
+
+    vector = embeddings.embed_query("退货政策是什么")
+
+    assert len(vector) == rag_pipeline.MockEmbeddings.DIMENSION
+    assert all(-1.0 <= value <= 1.0 for value in vector)
+    assert vector == embeddings.embed_query("退货政策是什么")
+    assert vector != embeddings.embed_query("客服工作时间")
+
+
+def test_mock_embed_documents_matches_embed_query():
+    embeddings = rag_pipeline.MockEmbeddings()
+    texts = ["退货政策是什么", "客服工作时间"]
+
+    vectors = embeddings.embed_documents(texts)
+
+    assert len(vectors) == 2
+    for text, vector in zip(texts, vectors):
+        assert vector == pytest.approx(embeddings.embed_query(text))
+
+
+class FakeRedis:
+    """记录incr调用的redis_manager替身"""
+
+    def __init__(self):
+        self.incremented = []
+
+    def incr(self, key):
+        self.incremented.append(key)
+        return len(self.incremented)
+
+
+def test_bump_retrieval_version_invalidates_caches_of_that_collection(monkeypatch):
+    fake_redis = FakeRedis()
+    monkeypatch.setattr(rag_pipeline, "redis_manager", fake_redis)
+    pipeline = rag_pipeline.RAGPipeline(collection_name="test_docs")
+    other = rag_pipeline.RAGPipeline(collection_name="other_docs")
+    pipeline._doc_count = (time.monotonic(), 10)
+    other._doc_count = (time.monotonic(), 20)
+
+    rag_pipeline.bump_retrieval_version("test_docs")
+
+    assert fake_redis.incremented == [rag_pipeline.retrieval_version_key("test_docs")]
+    assert pipeline._doc_count[1] is None
+    assert other._doc_count[1] == 20
@@ -5,9 +5,17 @@
 """
 import asyncio
 import os
+import re
 import logging
 from datetime import datetime
 import aiomysql
+from pymysql.constants import CLIENT
+
+# uvloop（uvicorn[standard]附带）降低每次await的事件循环开销；Windows上不可用
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
@@ -104,72 +112,73 @@ VALUES ('admin', 'admin@example.com', '$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN
 -- 创建一些示例数据
 INSERT IGNORE INTO chat_sessions (session_id, user_id, status) 
 VALUES ('demo-session-1', 'demo-user', 'active');
+"""
 
-INSERT IGNORE INTO chat_messages (session_id, role, content, user_id)
-VALUES 
+# 示例消息，executemany 会改写为一条多行 INSERT，数据增多时仍只需一次往返
+INSERT_SEED_MESSAGE_SQL = (
+    "INSERT IGNORE INTO chat_messages (session_id, role, content, user_id) "
+    "VALUES (%s, %s, %s, %s)"
+)
+SEED_MESSAGES = [
     ('demo-session-1', 'user', '你好，这是一个示例对话', 'demo-user'),
-    ('demo-session-1', 'assistant', '您好！我是客服助手，很高兴为您服务。有什么我可以帮助您的吗？', NULL);
-"""
+    ('demo-session-1', 'assistant', '您好！我是客服助手，很高兴为您服务。有什么我可以帮助您的吗？', None),
+]
 
-async def create_database():
-    """创建数据库"""
+# 导入时去掉 -- 注释行，执行时整段脚本一次发送
+_COMMENT_LINE_RE = re.compile(r'^\s*--.*$\n?', re.MULTILINE)
+CREATE_TABLES_SCRIPT = _COMMENT_LINE_RE.sub('', CREATE_TABLES_SQL)
+
+# 初始化后需要存在的数据表
+EXPECTED_TABLES = ('users', 'chat_sessions', 'chat_messages', 'user_feedback')
+
+async def create_database(conn):
+    """创建数据库并切换到该库"""
     try:
-        # 连接MySQL服务器（不指定数据库）
-        conn = await aiomysql.connect(**DB_CONFIG)
         async with conn.cursor() as cursor:
             await cursor.execute(CREATE_DATABASE_SQL)
             logger.info(f"数据库 {DATABASE_NAME} 创建成功或已存在")
-        conn.close()
+        await conn.select_db(DATABASE_NAME)
         return True
     except Exception as e:
         logger.error(f"创建数据库失败: {e}")
         return False
 
-async def create_tables():
+async def create_tables(conn):
     """创建数据表"""
     try:
-        # 添加数据库名称到连接配置
-        db_config_with_db = DB_CONFIG.copy()
-        db_config_with_db['db'] = DATABASE_NAME
-        
-        conn = await aiomysql.connect(**db_config_with_db)
         async with conn.cursor() as cursor:
-            # 执行建表SQL
-            for statement in CREATE_TABLES_SQL.split(';'):
-                statement = statement.strip()
-                if statement and not statement.startswith('--'):
-                    await cursor.execute(statement)
+            # 整段建表SQL一次往返执行，逐个读取各语句的结果
+            await cursor.execute(CREATE_TABLES_SCRIPT)
+            while await cursor.nextset():
+                pass
+            await cursor.executemany(INSERT_SEED_MESSAGE_SQL, SEED_MESSAGES)
             
             logger.info("数据表创建成功")
-        conn.close()
         return True
     except Exception as e:
         logger.error(f"创建数据表失败: {e}")
         return False
 
-async def verify_tables():
+async def verify_tables(conn):
     """验证数据表是否创建成功"""
     try:
-        db_config_with_db = DB_CONFIG.copy()
-        db_config_with_db['db'] = DATABASE_NAME
+        placeholders = ','.join(['%s'] * len(EXPECTED_TABLES))
+        async with conn.cursor() as cursor:
+            # 一次元数据查询只取需要验证的表
+            await cursor.execute(
+                "SELECT table_name FROM information_schema.tables "
+                f"WHERE table_schema = %s AND table_name IN ({placeholders})",
+                [DATABASE_NAME, *EXPECTED_TABLES]
+            )
+            found_tables = {row[0] for row in await cursor.fetchall()}
         
-        conn = await aiomysql.connect(**db_config_with_db)
-        async with conn.cursor(aiomysql.DictCursor) as cursor:
-            await cursor.execute("SHOW TABLES")
-            tables = await cursor.fetchall()
-            
-            expected_tables = ['users', 'chat_sessions', 'chat_messages', 'user_feedback']
-            found_tables = [list(table.values())[0] for table in tables]
-            
-            logger.info(f"找到的数据表: {found_tables}")
-            
-            for table in expected_tables:
-                if table in found_tables:
-                    logger.info(f"✓ {table} 表存在")
-                else:
-                    logger.warning(f"✗ {table} 表不存在")
-                    
-        conn.close()
+        logger.info(f"找到的数据表: {sorted(found_tables)}")
+        
+        missing_tables = set(EXPECTED_TABLES) - found_tables
+        if missing_tables:
+            logger.warning(f"✗ 以下表不存在: {', '.join(sorted(missing_tables))}")
+        else:
+            logger.info(f"✓ {len(EXPECTED_TABLES)} 张表均存在")
         return True
     except Exception as e:
         logger.error(f"验证数据表失败: {e}")
@@ -179,40 +188,39 @@ async def main():
     """主函数"""
     logger.info("开始初始化数据库...")
     
-    # 检查数据库连接
+    # 建库、建表、验证共用一个连接（不指定数据库，允许一次执行多条语句）
     try:
-        # 先测试连接
-        temp_config = DB_CONFIG.copy()
-        temp_config['db'] = 'mysql'  # 连接到MySQL系统数据库
-        conn = await aiomysql.connect(**temp_config)
-        await conn.ping()
-        conn.close()
-        logger.info("✓ 数据库连接正常")
+        conn = await aiomysql.connect(**DB_CONFIG, client_flag=CLIENT.MULTI_STATEMENTS)
     except Exception as e:
         logger.error(f"✗ 数据库连接失败: {e}")
         return
     
-    # 创建数据库
-    if await create_database():
-        logger.info("✓ 数据库创建完成")
-    else:
-        logger.error("✗ 数据库创建失败")
-        return
-    
-    # 创建数据表
-    if await create_tables():
-        logger.info("✓ 数据表创建完成")
-    else:
-        logger.error("✗ 数据表创建失败")
-        return
-    
-    # 验证数据表
-    if await verify_tables():
-        logger.info("✓ 数据表验证完成")
-    else:
-        logger.warning("⚠ 数据表验证失败")
+    try:
+        # 创建数据库
+        if await create_database(conn):
+            logger.info("✓ 数据库创建完成")
+        else:
+            logger.error("✗ 数据库创建失败")
+            return
+        
+        # 创建数据表
+        if await create_tables(conn):
+            logger.info("✓ 数据表创建完成")
+        else:
+            logger.error("✗ 数据表创建失败")
+            return
+        
+        # 验证数据表
+        if await verify_tables(conn):
+            logger.info("✓ 数据表验证完成")
+        else:
+            logger.warning("⚠ 数据表验证失败")
+    finally:
+        conn.close()
     
     logger.info("数据库初始化完成！")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(main())
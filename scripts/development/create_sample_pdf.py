@@ -1,91 +1,138 @@
 #!/usr/bin/env python3
 """
-创建示例PDF政策文档（使用 Windows 自带中文字体）
+创建示例PDF政策文档（使用系统自带中文字体）
 """
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 import os
+import re
+
+# 行分类：章节标题、小节内容，其余为普通段落
+_CHAPTER_RE = re.compile(r'^第.+章')
+_SECTION_RE = re.compile(r'^[1-6]\.')
+
+# 各类行的样式：(字号, 左边距)
+_LINE_STYLES = {
+    'chapter': (14, 50),  # 章节标题：加粗（用黑体本身已较粗，或可换更大字号）
+    'section': (12, 70),  # 小节内容，缩进
+    'plain': (12, 50),    # 普通段落
+}
+
+# 中文字体候选路径（Windows 黑体 / Linux 文泉驿、AR PL / macOS 苹方），使用第一个存在的
+_FONT_CANDIDATES = (
+    r"C:\Windows\Fonts\simhei.ttf",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/usr/share/fonts/truetype/arphic/uming.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+)
+_FONT_NAME = "PolicyCJK"
+
+# 导入时注册一次字体，多次生成PDF时复用已解析的字体
+_FONT_PATH = next((path for path in _FONT_CANDIDATES if os.path.isfile(path)), None)
+if _FONT_PATH is None:
+    _FONT_ERROR = f"未找到中文字体，已查找: {', '.join(_FONT_CANDIDATES)}"
+else:
+    try:
+        pdfmetrics.registerFont(TTFont(_FONT_NAME, _FONT_PATH))
+        _FONT_ERROR = None
+    except Exception as e:
+        _FONT_ERROR = e
+
+# knowledge 目录是否已创建
+_DIR_READY = False
+
+
+def _classify_line(line):
+    """返回行的类型：chapter / section / plain"""
+    if _CHAPTER_RE.match(line):
+        return 'chapter'
+    if _SECTION_RE.match(line):
+        return 'section'
+    return 'plain'
+
+
+# 政策文档内容
+_POLICIES = (
+    "第一章 服务宗旨",
+    "1.1 我们的服务宗旨是以客户为中心，提供优质、高效的服务体验。",
+    "1.2 致力于快速响应客户需求，解决客户问题。",
+    "",
+    "第二章 服务时间",
+    "2.1 在线客服时间：工作日 9:00-18:00",
+    "2.2 紧急情况24小时响应机制",
+    "2.3 节假日期间提供值班服务",
+    "",
+    "第三章 服务标准",
+    "3.1 响应时间：在线客服3分钟内响应",
+    "3.2 处理时效：一般问题24小时内解决",
+    "3.3 服务态度：专业、友好、耐心",
+    "",
+    "第四章 客户权益",
+    "4.1 客户有权获得及时、准确的信息回复",
+    "4.2 客户有权要求服务记录和跟进",
+    "4.3 客户有权对服务质量进行评价",
+    "",
+    "第五章 投诉处理",
+    "5.1 投诉渠道：在线客服、电话、邮箱",
+    "5.2 投诉处理时限：3个工作日内给出回复",
+    "5.3 投诉处理标准：公平、公正、透明",
+    "",
+    "第六章 隐私保护",
+    "6.1 严格保护客户个人信息",
+    "6.2 未经授权不泄露客户信息",
+    "6.3 定期进行隐私安全培训",
+    "",
+    "本政策自2026年1月1日起执行，最终解释权归公司所有。",
+)
+
+# 导入时确定每行的样式 (字号, 左边距)，绘制循环中不再分类
+_STYLED_POLICIES = tuple((_LINE_STYLES[_classify_line(policy)], policy) for policy in _POLICIES)
+
 
 def create_policy_pdf():
-    """创建支持中文的政策PDF文档，使用 Windows 自带黑体"""
+    """创建支持中文的政策PDF文档，使用系统自带中文字体"""
+    global _DIR_READY
+
+    if _FONT_ERROR is not None:
+        # 在创建画布之前返回，不会留下空的PDF文件
+        print(f"❌ 无法加载中文字体: {_FONT_ERROR}")
+        return
+    print(f"✅ 成功加载中文字体: {_FONT_PATH}")
+
     # 确保 knowledge 目录存在
-    os.makedirs("knowledge", exist_ok=True)
+    if not _DIR_READY:
+        os.makedirs("knowledge", exist_ok=True)
+        _DIR_READY = True
     pdf_path = "knowledge/policy.pdf"
     
     # 创建PDF文档
     c = canvas.Canvas(pdf_path, pagesize=letter)
     width, height = letter
     
-    # 注册 Windows 自带黑体字体（SimHei）
-    try:
-        # Windows 字体路径
-        font_path = r"C:\Windows\Fonts\simhei.ttf"
-        pdfmetrics.registerFont(TTFont("SimHei", font_path))
-        print("✅ 成功加载 Windows 黑体字体")
-    except Exception as e:
-        print(f"❌ 无法加载黑体字体，请确保在 Windows 系统运行: {e}")
-        return
-
-    # 设置默认字体为黑体
-    c.setFont("SimHei", 12)
-
     y_position = height - 50
     line_height = 20
 
-    policies = [
-        "第一章 服务宗旨",
-        "1.1 我们的服务宗旨是以客户为中心，提供优质、高效的服务体验。",
-        "1.2 致力于快速响应客户需求，解决客户问题。",
-        "",
-        "第二章 服务时间",
-        "2.1 在线客服时间：工作日 9:00-18:00",
-        "2.2 紧急情况24小时响应机制",
-        "2.3 节假日期间提供值班服务",
-        "",
-        "第三章 服务标准",
-        "3.1 响应时间：在线客服3分钟内响应",
-        "3.2 处理时效：一般问题24小时内解决",
-        "3.3 服务态度：专业、友好、耐心",
-        "",
-        "第四章 客户权益",
-        "4.1 客户有权获得及时、准确的信息回复",
-        "4.2 客户有权要求服务记录和跟进",
-        "4.3 客户有权对服务质量进行评价",
-        "",
-        "第五章 投诉处理",
-        "5.1 投诉渠道：在线客服、电话、邮箱",
-        "5.2 投诉处理时限：3个工作日内给出回复",
-        "5.3 投诉处理标准：公平、公正、透明",
-        "",
-        "第六章 隐私保护",
-        "6.1 严格保护客户个人信息",
-        "6.2 未经授权不泄露客户信息",
-        "6.3 定期进行隐私安全培训",
-        "",
-        "本政策自2026年1月1日起执行，最终解释权归公司所有。"
-    ]
-
-    for policy in policies:
+    # 每页只输出一个文本块，字号变化时才切换字体
+    text = c.beginText()
+    font_size = None
+    for (size, x), policy in _STYLED_POLICIES:
         if y_position < 50:  # 换页
+            c.drawText(text)
             c.showPage()
-            c.setFont("SimHei", 12)
+            text = c.beginText()
+            font_size = None
             y_position = height - 50
 
-        if policy.startswith("第") and "章" in policy:
-            # 章节标题：加粗（用黑体本身已较粗，或可换更大字号）
-            c.setFont("SimHei", 14)
-            c.drawString(50, y_position, policy)
-            c.setFont("SimHei", 12)
-        elif policy.startswith(("1.", "2.", "3.", "4.", "5.", "6.")):
-            # 小节内容，缩进
-            c.drawString(70, y_position, policy)
-        else:
-            # 普通段落
-            c.drawString(50, y_position, policy)
+        if size != font_size:
+            text.setFont(_FONT_NAME, size)
+            font_size = size
+        text.setTextOrigin(x, y_position)
+        text.textOut(policy)
 
         y_position -= line_height
+    c.drawText(text)
 
     # 保存PDF
     c.save()
@@ -3,11 +3,54 @@
 验证脚本路径引用是否正确
 """
 import os
+import re
 import sys
 
-def check_file_exists(file_path):
-    """检查文件是否存在"""
-    if os.path.exists(file_path):
+# README.md中需要出现的启动脚本引用，一次扫描匹配全部（按字节匹配，无需解码）
+_README_SCRIPT_RE = re.compile(rb'scripts\\startup\\start_(backend|frontend)\.bat')
+_README_REQUIRED_SCRIPTS = {b'backend', b'frontend'}
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_BASE_DIR)
+
+# 需要验证的脚本文件，路径在导入时拼接一次
+SCRIPTS_TO_CHECK = (
+    # 启动脚本
+    os.path.join(_BASE_DIR, "startup", "start_backend.bat"),
+    os.path.join(_BASE_DIR, "startup", "start_frontend.bat"),
+    os.path.join(_BASE_DIR, "startup", "start_docker.bat"),
+    
+    # 数据库脚本
+    os.path.join(_BASE_DIR, "database", "init_database.py"),
+    os.path.join(_BASE_DIR, "database", "migrations", "initial_migration.py"),
+    
+    # 开发工具脚本
+    os.path.join(_BASE_DIR, "development", "create_sample_pdf.py"),
+    
+    # SQL文件
+    os.path.join(_BASE_DIR, "sql", "orders_table.sql"),
+    os.path.join(_BASE_DIR, "sql", "policies", "退换货政策.txt"),
+)
+
+def list_entries(directories):
+    """每个目录只做一次scandir，返回 {目录: 文件名集合}，目录不存在时为空集合"""
+    entries = {}
+    for directory in directories:
+        try:
+            with os.scandir(directory) as it:
+                entries[directory] = {entry.name for entry in it}
+        except OSError:
+            entries[directory] = set()
+    return entries
+
+def check_file_exists(file_path, dir_entries=None):
+    """检查文件是否存在；传入所在目录的文件名集合时直接查找，不再单独stat"""
+    if dir_entries is not None:
+        exists = os.path.basename(file_path) in dir_entries
+    else:
+        # lexists只做一次lstat，不跟随符号链接
+        exists = os.path.lexists(file_path)
+    if exists:
         print(f"✓ {file_path}")
         return True
     else:
@@ -19,41 +62,21 @@ def main():
     print("开始验证脚本文件路径...")
     print("=" * 50)
     
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(base_dir)
-    
-    # 验证脚本文件
-    scripts_to_check = [
-        # 启动脚本
-        os.path.join(base_dir, "startup", "start_backend.bat"),
-        os.path.join(base_dir, "startup", "start_frontend.bat"),
-        os.path.join(base_dir, "startup", "start_docker.bat"),
-        
-        # 数据库脚本
-        os.path.join(base_dir, "database", "init_database.py"),
-        os.path.join(base_dir, "database", "migrations", "initial_migration.py"),
-        
-        # 开发工具脚本
-        os.path.join(base_dir, "development", "create_sample_pdf.py"),
-        
-        # SQL文件
-        os.path.join(base_dir, "sql", "orders_table.sql"),
-        os.path.join(base_dir, "sql", "policies", "退换货政策.txt"),
-    ]
-    
     print("检查脚本文件:")
     all_exist = True
-    for script in scripts_to_check:
-        if not check_file_exists(script):
+    dir_entries = list_entries({os.path.dirname(script) for script in SCRIPTS_TO_CHECK})
+    for script in SCRIPTS_TO_CHECK:
+        if not check_file_exists(script, dir_entries[os.path.dirname(script)]):
             all_exist = False
     
     print("\n检查相关配置文件:")
     # 验证docker-compose.yml中的引用
-    docker_compose_path = os.path.join(project_root, "docker-compose.yml")
+    docker_compose_path = os.path.join(_PROJECT_ROOT, "docker-compose.yml")
     if os.path.exists(docker_compose_path):
-        with open(docker_compose_path, 'r', encoding='utf-8') as f:
+        # 只做ASCII子串查找，按字节读取省去UTF-8解码
+        with open(docker_compose_path, 'rb') as f:
             content = f.read()
-            if "../scripts/database/init_database.py" in content:
+            if b"../scripts/database/init_database.py" in content:
                 print("✓ docker-compose.yml 中的路径引用正确")
             else:
                 print("✗ docker-compose.yml 中的路径引用可能不正确")
@@ -63,11 +86,12 @@ def main():
         all_exist = False
     
     print("\n检查README.md中的引用:")
-    readme_path = os.path.join(project_root, "README.md")
+    readme_path = os.path.join(_PROJECT_ROOT, "README.md")
     if os.path.exists(readme_path):
-        with open(readme_path, 'r', encoding='utf-8') as f:
+        with open(readme_path, 'rb') as f:
             content = f.read()
-            if "scripts\\startup\\start_backend.bat" in content and "scripts\\startup\\start_frontend.bat" in content:
+            found_scripts = {m.group(1) for m in _README_SCRIPT_RE.finditer(content)}
+            if _README_REQUIRED_SCRIPTS <= found_scripts:
                 print("✓ README.md 中的路径引用正确")
             else:
                 print("✗ README.md 中的路径引用可能不正确")